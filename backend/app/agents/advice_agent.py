@@ -1,11 +1,183 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, select, union_all, literal, null, cast, String
 from app.models import User, Paper, PaperMetadata, ChatHistory, UserReadPaper, Recommendation
-from app.utils.kanana import call_kanana
-from typing import List, Optional
+from app.utils.kanana import call_kanana_async, call_kanana_stream_async, SYSTEM_PROMPT
+from typing import AsyncIterator, List, Optional
 from datetime import datetime, timedelta
+import asyncio
 import json
 import re
+from collections import Counter
+import hashlib
+import orjson
+from cachetools import TTLCache
+
+# ------------------------------------
+# 프롬프트 (고정 지시문)
+# ------------------------------------
+# 사용자마다 바뀌지 않는 역할/규칙/JSON 스키마는 system 메시지로 맨 앞에 두고,
+# 사용자별 데이터는 user 메시지(프롬프트 끝)로 보내 LLM 서버의 prefix KV 캐시를 재사용합니다.
+
+INTEREST_ADVICE_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+당신은 **친절한 전문 멘토 AI**입니다. 사용자 메시지로 주어지는 [사용자 프로필]과 [최근 1주간 활동 패턴]을 바탕으로 사용자의 실제 관심사가 현재 설정된 관심 분야와 다른지 분석하세요.
+분석 결과에 따라 다음 중 하나의 JSON 형식으로만 응답하세요.
+
+1. **새로운 관심 분야를 제안해야 하는 경우:**
+    (조건: 활동 키워드가 현재 관심 분야와 명확히 다르며, 충분한 빈도로 나타날 때)
+{
+    "advice_type": "interest_change",
+    "suggested_interest": "사용자 활동에서 가장 자주 나타나는 새로운 키워드",
+    "reason": "**친절하고 부드러운 대화체(말 끝에 '~네요', '~하셨어요' 등 사용)**를 기반으로 제안형 어투를 사용하여 2~3줄 이내의 변경 제안 이유. 이유의 마지막 문장을 반드시 '새 관심 분야를 [suggested_interest]로 변경해 보시겠어요?'와 같이 구체적인 액션을 유도하는 질문형으로 마무리하세요."
+}
+
+2. **현재 관심 분야를 유지해야 하는 경우:**
+    (조건: 제안할 새로운 키워드가 없거나, 활동 키워드가 현재 관심 분야와 동일하거나 유사할 때)
+{
+    "advice_type": "none",
+    "message": "전문 멘토의 말투로 2~3줄 이내의 친근하고 부드러운 유지 제안 이유"
+}
+
+**주의:** 만약 가장 자주 나타나는 키워드가 **현재 관심 분야와 동일**하다면, **반드시 "advice_type": "none"을 반환**해야 합니다."""
+
+LEVEL_ADVICE_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+당신은 **친절한 전문 멘토 AI**입니다. 사용자 메시지로 주어지는 사용자의 최근 질문 목록을 분석하여 **이해도의 점수 (comprehension_scoring)**를 1부터 100 사이의 숫자로 매기고, 현재 레벨보다 **높은 레벨로 상향 조정 (suggest higher level)**이 필요한지 판단하세요.
+
+* **상향 조정 기준:** 질문의 깊이, 전문성, 복잡도를 종합적으로 고려합니다. (예: 단순 용어 질문 < 개념 간 관계 질문 < 한계나 확장 질문)
+* **상향 조정 임계값:** Beginner에서 Intermediate로 제안은 70점 이상, Intermediate에서 Advanced로 제안은 80점 이상일 때 고려합니다.
+
+분석 결과에 따라 다음 중 하나의 JSON 형식으로만 응답하세요.
+
+1. **레벨 상향을 제안해야 하는 경우 (answer > threshold):**
+{
+    "advice_type": "level_change",
+    "comprehension_score": "분석된 이해도 점수 (1~100)",
+    "suggested_level": "intermediate" | "advanced",
+    "reason": "**친절하고 부드러운 대화체(말 끝에 '~네요', '~하셨어요' 등 사용)**를 기반으로 제안형 어투를 사용하여 2~3줄 이내의 상향 제안 이유. 이유의 마지막 문장을 반드시 '학습 레벨을 [suggested_level]로 상향 조정해 보시겠어요?'와 같이 구체적인 액션을 유도하는 질문형으로 마무리하세요."
+}
+
+2. **레벨을 유지해야 하는 경우:**
+{
+    "advice_type": "none",
+    "message": "전문 멘토의 말투로 **제안형 어투('~해보시는 게 좋겠어요', '~하는 것이 어떨까요?')를 사용하여** 2~3줄 이내의 레벨 유지 제안 이유"
+}
+
+질문이 3개 미만이거나 레벨이 'advanced'인 경우 레벨 변경을 제안하지 않습니다."""
+
+STUDY_ADVICE_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+당신은 사용자의 **성장을 돕는 전문 멘토 AI**입니다.
+사용자 메시지로 [사용자 프로필], [최근 1주간 활동 패턴 분석], [구조화된 조언 결과]가 주어집니다.
+친절하고 **따뜻하며**, 사용자의 노력을 인정하고 동기 부여와 실천을 유도하는 **친근한 대화체와 제안형 말투**로 다음 4가지 코칭 요소를 모두 포함하는 **자연스러운 대화 형식**의 학습 코칭 메시지를 생성하세요.
+
+1. **조언 결과 통합:** [구조화된 조언 결과] 섹션의 내용을 **가장 먼저** 자연스러운 말투로 언급하며 시작하세요.
+2. **집중도 코칭:** 최근 활동 키워드를 분석하여, 현재 관심 분야 내에서 **가장 깊이 파야 할 세부 주제**를 1~2개 꼽고, 관련 논문 1~2편을 더 찾아보도록 조언하세요. (관심 분야가 미설정이라면, 가장 자주 나온 키워드를 중심으로 주제를 확정하도록 조언)
+3. **학습 효율성 조언:** 챗봇 질문의 경향(빈도 및 깊이)을 바탕으로, [사용자 프로필]의 **희망 학습 레벨**에 맞게 **'논문을 읽는 방법'**이나 **'질문하는 습관'**을 개선할 수 있는 구체적인 팁을 제시하세요.
+4. **다음 주 액션 플랜:** 다음 1주간 **정량적으로 달성 가능한 학습 목표**와 구체적인 **실천 방법**을 1~2가지 제시하세요. (예: "매일 15분 동안 읽은 논문의 핵심 구조를 마인드맵으로 정리하기" 또는 "세미나 자료를 만들듯 핵심 내용을 5줄 요약하는 연습하기")
+
+메시지는 모든 정보를 담으면서도 2줄 내외의 간결한 길이로 유지해주세요."""
+
+
+# ------------------------------------
+# 프롬프트 (사용자별 데이터 템플릿)
+# ------------------------------------
+
+INTEREST_PROMPT_TMPL = """[사용자 프로필]
+- 현재 관심 분야: {current_interest}
+
+[최근 1주간 활동 패턴]
+- 최근 다룬 키워드: {keywords_joined}"""
+
+LEVEL_PROMPT_TMPL = """[사용자 프로필]
+- 현재 학습 레벨: {current_level}
+
+[최근 3개 논문에 대한 질문 9개]
+- 질문 목록: {questions_joined}"""
+
+STUDY_PROMPT_TMPL = """[사용자 프로필]
+- 이름: {username}
+- 관심 분야: {interest}
+- 희망 학습 레벨: {level}
+- 총 논문 읽은 개수: {total_read_count}개
+
+[최근 1주간 활동 패턴 분석]
+- 최근 다룬 키워드: {keywords_joined}
+- 최근 챗봇 질문 내용 요약: {questions_joined}
+
+[구조화된 조언 결과]
+{advice_context}"""
+
+
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```|(\{.*\})", re.DOTALL)
+
+
+def _extract_json(raw: str) -> dict:
+    """LLM 응답에서 JSON 객체를 추출합니다. (```json 마크다운 블록 우선, 없으면 가장 바깥 중괄호)"""
+    match = _JSON_BLOCK_RE.search(raw)
+
+    if not match:
+        # JSON 객체나 마크다운 블록 자체를 찾지 못한 경우
+        raise ValueError("LLM 응답에서 JSON을 찾을 수 없습니다.")
+
+    # 캡처 그룹 1 (마크다운 내부 JSON)이 있으면 사용, 없으면 캡처 그룹 2 (일반 JSON) 사용
+    json_string = match.group(1) or match.group(2)
+
+    try:
+        return json.loads(json_string)
+    except json.JSONDecodeError as json_e:
+        # JSON 포맷은 찾았지만, 내부 구조가 깨진 경우
+        raise ValueError(f"찾은 문자열은 JSON이 아니거나 형식이 올바르지 않습니다: {json_e}")
+
+
+# 관심 분야/난이도 변경을 판단하기 위한 최소 활동량
+MIN_KEYWORDS_FOR_INTEREST = 5
+MIN_QUESTIONS_FOR_LEVEL = 3
+
+# 이 기준보다 활동이 적으면 학습 조언을 LLM 대신 정해진 문구로 생성
+LOW_ACTIVITY_MIN_KEYWORDS = 3
+LOW_ACTIVITY_MIN_QUESTIONS = 2
+
+LOW_ACTIVITY_OPENINGS = {
+    "interest_change": "최근 활동을 보니 관심 분야를 '{suggested_interest}'(으)로 바꿔 보시는 것도 좋겠어요.",
+    "level_change": "질문 수준이 높아지고 있어요. 학습 레벨을 '{suggested_level}'(으)로 올려 보시는 건 어떨까요?",
+    "none": "지금의 학습 방향을 잘 유지하고 계시네요.",
+}
+
+LOW_ACTIVITY_ADVICE_TMPL = (
+    "{opening} 이번 주에는 {username}님의 관심 분야 논문을 2편 정도 더 읽고, "
+    "읽을 때마다 챗봇에게 핵심 내용을 한 가지씩 질문해 보시는 걸 추천드려요!"
+)
+
+# JSON 응답은 짧으므로 생성 토큰 수 상한을 낮게 잡아 불필요한 디코딩을 막습니다.
+# (한국어 reason 2~3줄이 잘리지 않을 정도의 여유만 둠)
+INTEREST_ADVICE_MAX_TOKENS = 256
+LEVEL_ADVICE_MAX_TOKENS = 320
+
+
+# ------------------------------------
+# 조언 결과 캐시
+# ------------------------------------
+
+# 사용자별 조언 결과를 10분간 재사용 (Kanana 호출 생략)
+# 캐시 키에 활동 데이터가 포함되므로 새 논문/질문이 생기면 자연스럽게 miss 처리됨
+_advice_cache = TTLCache(maxsize=10_000, ttl=600)
+
+
+def _advice_cache_key(kind: str, user: User, analysis_data: dict) -> str:
+    """사용자 프로필 + 활동 데이터로 캐시 키 생성"""
+    payload = orjson.dumps([
+        kind,
+        user.user_id,
+        user.level,
+        user.interest,
+        sorted(str(k) for k in analysis_data["keywords"]),
+        analysis_data["questions"],
+        analysis_data["recent_level_questions"],
+        analysis_data["total_read_count"],
+    ])
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
 
 # ------------------------------------
 # Agent 객체 정의
@@ -16,63 +188,142 @@ class AdviceAgent:
     사용자 활동 패턴 (논문 키워드, 챗봇 질문) 분석 후 학습 조언을 제공하는 Agent
     """
 
-    def _get_analysis_data(self, db: Session, user_id: int) -> dict:
-        """최근 1주일 활동 데이터를 조회하여 조언 생성에 필요한 자료를 수집합니다."""
-        one_week_ago = datetime.utcnow() - timedelta(days=7)
-
-        # 1. 최근 1주일 읽은 논문의 키워드 조회 (PaperMetadata)
-        recent_read_keywords = (
-            db.query(PaperMetadata.keywords)
-            .join(UserReadPaper, UserReadPaper.paper_id == PaperMetadata.paper_id)
-            .filter(UserReadPaper.user_id == user_id, UserReadPaper.read_at >= one_week_ago)
-            .all()
+    def _get_user(self, db: Session, user_id: int) -> Optional[User]:
+        """조언 생성에 필요한 사용자 컬럼만 조회합니다. (비밀번호 등 불필요한 컬럼 제외)"""
+        return (
+            db.query(User)
+            .options(load_only(User.user_id, User.username, User.interest, User.level))
+            .filter(User.user_id == user_id)
+            .first()
         )
 
-        all_keywords = []
-        for keywords_text in recent_read_keywords:
-            keyword_data = keywords_text[0] if keywords_text and keywords_text[0] else None
+    def _get_analysis_data(self, db: Session, user_id: int) -> dict:
+        """최근 1주일 활동 데이터를 조회하여 조언 생성에 필요한 자료를 수집합니다.
 
-            if not keyword_data:
-                continue
+        키워드 / 최근 질문 / 총 읽은 논문 수 / 레벨 판단용 질문을 UNION ALL로 묶어
+        DB 왕복 1회로 가져옵니다. 각 행의 kind 컬럼으로 어떤 데이터인지 구분합니다.
+        """
+        one_week_ago = datetime.utcnow() - timedelta(days=7)
 
-            try:
-                parsed = json.loads(keyword_data)
+        # 0. 사용자의 읽은 논문 기록 (키워드 / 총 개수 / 최근 3개 논문 조회가 공유)
+        # 여러 번 참조되는 CTE이므로 user_read_papers를 사용자 기준으로 한 번만 스캔합니다.
+        user_reads = (
+            select(UserReadPaper.paper_id, UserReadPaper.read_at)
+            .where(UserReadPaper.user_id == user_id)
+            .cte("user_reads")
+        )
 
-                if isinstance(parsed, list): # JSON으로 가정
-                    all_keywords.extend(parsed)
-                else: # JSON이지만 리스트가 아닌 경우 (예: {"key": "value"}) 또는 단일 문자열로 저장된 경우
-                    all_keywords.append(str(parsed))
-            except json.JSONDecodeError: # JSON이 아니면 그냥 문자열로 처리
-               pass
+        # 1. 최근 1주일 읽은 논문의 키워드 (PaperMetadata)
+        # 같은 논문을 여러 번 읽어도 키워드는 한 번만 가져오도록 JOIN 대신 IN (semi-join) 사용
+        recent_read_paper_ids = (
+            select(user_reads.c.paper_id)
+            .where(user_reads.c.read_at >= one_week_ago)
+        )
+        keyword_rows = (
+            select(
+                literal("keyword").label("kind"),
+                PaperMetadata.keywords.label("value"),
+                null().label("created_at")
+            )
+            .where(
+                PaperMetadata.paper_id.in_(recent_read_paper_ids),
+                PaperMetadata.keywords.isnot(None)
+            )
+        )
 
         # 2. 최근 1주일 챗봇 질문 기록 (ChatHistory)
-        recent_questions = (
-            db.query(ChatHistory.question)
-            .join(Paper, ChatHistory.paper_id == Paper.paper_id)
-            .filter(ChatHistory.user_id == user_id, ChatHistory.created_at >= one_week_ago)
-            .all()
+        question_rows = (
+            select(
+                literal("question").label("kind"),
+                ChatHistory.question.label("value"),
+                ChatHistory.created_at.label("created_at")
+            )
+            .where(ChatHistory.user_id == user_id, ChatHistory.created_at >= one_week_ago)
         )
-        recent_question_texts = [q[0] for q in recent_questions]
 
         # 3. 총 읽은 논문 수
-        total_read_count = db.query(UserReadPaper).filter(UserReadPaper.user_id == user_id).count()
+        total_rows = (
+            select(
+                literal("total").label("kind"),
+                cast(func.count(), String).label("value"),
+                null().label("created_at")
+            )
+            .select_from(user_reads)
+        )
 
         # 4. 최근 3개 논문 보고 지은 질문 (난이도 Advice Agent용)
         # 최근 3개 논문에 대한 질문 9개 수집 가정
-        recent_papers_id = db.query(UserReadPaper.paper_id).filter(UserReadPaper.user_id == user_id).order_by(UserReadPaper.read_at.desc()).limit(3).all()
-        recent_paper_ids = [p[0] for p in recent_papers_id]
-
-        recent_questions_for_level = (
-            db.query(ChatHistory.question)
-            .filter(ChatHistory.user_id == user_id, ChatHistory.paper_id.in_(recent_paper_ids))
+        recent_paper_ids = (
+            select(user_reads.c.paper_id)
+            .order_by(user_reads.c.read_at.desc())
+            .limit(3)
+            .subquery()
+        )
+        level_question_sub = (
+            select(
+                literal("level_question").label("kind"),
+                ChatHistory.question.label("value"),
+                ChatHistory.created_at.label("created_at")
+            )
+            .where(
+                ChatHistory.user_id == user_id,
+                ChatHistory.paper_id.in_(select(recent_paper_ids.c.paper_id))
+            )
             .order_by(ChatHistory.created_at.desc())
             .limit(9)
-            .all()
+            .subquery()
+        )
+        level_question_rows = select(
+            level_question_sub.c.kind,
+            level_question_sub.c.value,
+            level_question_sub.c.created_at
+        )
+
+        rows = db.execute(
+            union_all(keyword_rows, question_rows, total_rows, level_question_rows)
+        ).tuples().all()
+
+        all_keywords = []
+        recent_question_texts = []
+        total_read_count = 0
+        level_questions = []
+
+        for kind, value, created_at in rows:
+            if kind == "keyword":
+                if not value:
+                    continue
+
+                try:
+                    parsed = orjson.loads(value)
+
+                    if isinstance(parsed, list): # JSON으로 가정
+                        all_keywords.extend(parsed)
+                    else: # JSON이지만 리스트가 아닌 경우 (예: {"key": "value"}) 또는 단일 문자열로 저장된 경우
+                        all_keywords.append(str(parsed))
+                except orjson.JSONDecodeError: # JSON이 아니면 그냥 문자열로 처리
+                    pass
+            elif kind == "question":
+                recent_question_texts.append(value)
+            elif kind == "total":
+                total_read_count = int(value or 0)
+            elif kind == "level_question":
+                level_questions.append((created_at, value))
+
+        # UNION ALL 결과는 순서가 보장되지 않으므로 최신순으로 다시 정렬
+        level_questions.sort(key=lambda q: q[0] or datetime.min, reverse=True)
+        recent_level_question_texts = [q[1] for q in level_questions]
+
+        # 정규화(소문자/공백 제거)한 키워드 빈도를 한 번만 계산해 재사용
+        # (프롬프트용 문자열은 각 프롬프트를 만들 때 이 목록/빈도에서 만듦)
+        keyword_counts = Counter(
+            kw.lower().strip() for kw in map(str, all_keywords) if kw and kw.strip()
         )
-        recent_level_question_texts = [q[0] for q in recent_questions_for_level]
 
         return {
-            "keywords": all_keywords,
+            # 중복 제거 + 정렬한 키워드 목록 (같은 활동이면 항상 같은 프롬프트 → prefix 캐시/조언 캐시 재사용)
+            "keywords": sorted(keyword_counts),
+            "keyword_count": sum(keyword_counts.values()),
+            "keyword_counts": keyword_counts,
             "questions": recent_question_texts,
             "total_read_count": total_read_count,
             "recent_level_questions": recent_level_question_texts
@@ -91,7 +342,7 @@ class AdviceAgent:
         사용자 활동을 분석하여 관심 분야/난이도 변경 제안 또는 조언 없음을 반환합니다.
         (관심 분야 Advice Agent, 난이도 Advice Agent 로직을 Kanana 호출로 대체)
         """
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = self._get_user(db, user_id)
         if not user:
             return {
                 "advice_type": "none",
@@ -106,45 +357,81 @@ class AdviceAgent:
                 "message": "아직 읽은 논문 기록이 없어요. 첫 논문을 읽어보시면 맞춤 조언을 드릴 수 있어요!"
             }
 
+        return await self._structured_advice(user, analysis_data)
+
+    async def _structured_advice(self, user: User, analysis_data: dict) -> dict:
+        """이미 조회한 사용자/활동 데이터로 구조화된 조언을 반환합니다. (조언 캐시 사용)"""
+        cache_key = _advice_cache_key("suggest", user, analysis_data)
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        result = await self._suggest(user, analysis_data)
+        _advice_cache[cache_key] = result
+        return dict(result)
+
+    async def _suggest(self, user: User, analysis_data: dict) -> dict:
+        """Kanana 호출로 관심 분야/난이도 변경 제안을 생성합니다. (캐시를 거치지 않는 본체)"""
+        # 두 판단 기준은 서로 독립적이므로 Kanana 호출을 동시에 실행합니다.
+        # (결과 우선순위는 기존과 동일: 관심 분야 변경 > 난이도 변경 > 조언 없음)
+        current_level = user.level or "beginner"
+        questions_for_level = analysis_data['recent_level_questions']
+
+        # 가장 자주 등장한 키워드가 현재 관심 분야와 같으면 LLM도 반드시 "none"을 반환해야 하므로
+        # 관심 분야 Kanana 호출을 생략합니다.
+        keyword_freq = analysis_data['keyword_counts']
+        top_keyword, _ = keyword_freq.most_common(1)[0] if keyword_freq else (None, 0)
+        current_interest = (user.interest or "").lower().strip()
+
+        tasks = []
+        if (
+            analysis_data['keyword_count'] >= MIN_KEYWORDS_FOR_INTEREST
+            and top_keyword is not None
+            and top_keyword != current_interest
+        ):
+            tasks.append(self._suggest_interest(user, keyword_freq))
+        if len(questions_for_level) >= MIN_QUESTIONS_FOR_LEVEL and current_level != "advanced":
+            tasks.append(self._suggest_level(user, questions_for_level))
+
+        # 두 조건 모두 만족하지 않으면 프롬프트를 만들지 않고 바로 조언 없음 반환
+        if tasks:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            for result in results:
+                if isinstance(result, dict):
+                    return result
+
+        # ----------------------------------------
+        # 3. 조언 없음 (두 LLM Agent 모두 변경 제안이 없었을 경우)
+        # ----------------------------------------
+        return {
+            "advice_type": "none",
+            "message": "오늘도 열심히 논문 공부를 해보아요! 현재 학습 방향이 매우 좋습니다."
+        }
+
+    async def _suggest_interest(self, user: User, keyword_counts: Counter) -> Optional[dict]:
         # ----------------------------------------
         # 1. 관심 분야 변경 제안 로직 (LLM(Kanana) 사용)
         # ----------------------------------------
-        keywords = analysis_data['keywords']
         current_interest = user.interest or "미설정"
         
-        # 관심 분야 Advice Agent 프롬프트
-        interest_prompt = f"""
-        [사용자 프로필]
-        - 현재 관심 분야: {current_interest}
-        
-        [최근 1주간 활동 패턴]
-        - 최근 다룬 키워드: {', '.join(keywords) or '키워드 없음'}
-        ---
-        
-        당신은 **친절한 전문 멘토 AI**입니다. 위 정보를 바탕으로 사용자의 실제 관심사가 현재 설정된 관심 분야와 다른지 분석하세요.
-        분석 결과에 따라 다음 중 하나의 JSON 형식으로만 응답하세요.
+        # 관심 분야 판단에는 키워드 빈도가 필요하므로 중복 키워드를 "키워드(횟수)" 형태로 한 번만 넣음
+        # (빈도순, 같은 빈도는 이름순으로 정렬해 같은 활동이면 항상 같은 프롬프트)
+        keyword_freq_items = sorted(keyword_counts.items(), key=lambda item: (-item[1], item[0]))
         
-        1. **새로운 관심 분야를 제안해야 하는 경우:**
-            (조건: 활동 키워드가 현재 관심 분야와 명확히 다르며, 충분한 빈도로 나타날 때)
-        {{
-            "advice_type": "interest_change",
-            "suggested_interest": "사용자 활동에서 가장 자주 나타나는 새로운 키워드",
-            "reason": "**친절하고 부드러운 대화체(말 끝에 '~네요', '~하셨어요' 등 사용)**를 기반으로 제안형 어투를 사용하여 2~3줄 이내의 변경 제안 이유. 이유의 마지막 문장을 반드시 '새 관심 분야를 [suggested_interest]로 변경해 보시겠어요?'와 같이 구체적인 액션을 유도하는 질문형으로 마무리하세요."
-        }}
-        
-        2. **현재 관심 분야를 유지해야 하는 경우:**
-            (조건: 제안할 새로운 키워드가 없거나, 활동 키워드가 현재 관심 분야와 동일하거나 유사할 때)
-        {{
-            "advice_type": "none",
-            "message": "전문 멘토의 말투로 2~3줄 이내의 친근하고 부드러운 유지 제안 이유"
-        }}
-        
-        **주의:** 만약 가장 자주 나타나는 키워드가 **현재 관심 분야와 동일**하다면, **반드시 "advice_type": "none"을 반환**해야 합니다.
-        """
+        # 관심 분야 Advice Agent 프롬프트
+        interest_prompt = INTEREST_PROMPT_TMPL.format(
+            current_interest=current_interest,
+            keywords_joined=", ".join(f"{kw}({count})" for kw, count in keyword_freq_items) or '키워드 없음'
+        )
 
         try:
             # Kanana 호출
-            interest_advice_raw = call_kanana(interest_prompt)
+            interest_advice_raw = await call_kanana_async(
+                interest_prompt,
+                system_prompt=INTEREST_ADVICE_SYSTEM_PROMPT,
+                max_tokens=INTEREST_ADVICE_MAX_TOKENS
+            )
             
             # 💡 로그 추가: Kanana 원시 응답 확인
             print(f"--- Kanana (관심 분야) 원시 응답 시작 ---")
@@ -152,20 +439,7 @@ class AdviceAgent:
             print(f"--- Kanana (관심 분야) 원시 응답 끝 ---")
 
             # JSON 파싱
-            match = re.search(r"(\{.*?\}|\`\`\`json\s*(\{.*?\})\s*\`\`\`)", interest_advice_raw, re.DOTALL)
-
-            if match:
-                # 캡처 그룹 2 (마크다운 내부 JSON)가 있으면 사용, 없으면 캡처 그룹 1 (일반 JSON) 사용
-                json_string = match.group(2) if match.group(2) else match.group(1) 
-    
-                try:
-                    interest_advice = json.loads(json_string)
-                except json.JSONDecodeError as json_e:
-                    # JSON 포맷은 찾았지만, 내부 구조가 깨진 경우
-                    raise ValueError(f"찾은 문자열은 JSON이 아니거나 형식이 올바르지 않습니다: {json_e}")
-            else:
-                # JSON 객체나 마크다운 블록 자체를 찾지 못한 경우
-                raise ValueError("LLM 응답에서 JSON을 찾을 수 없습니다.")
+            interest_advice = _extract_json(interest_advice_raw)
 
             # LLM이 interest_change를 반환했을 경우, 후처리 로직 실행 (안전 장치)
             if interest_advice.get("advice_type") == "interest_change":
@@ -185,127 +459,104 @@ class AdviceAgent:
 
         except Exception as e:
             print(f"Kanana (관심 분야) 호출 또는 파싱 중 에러 발생: {e}")
-            # 에러 발생 시 난이도 제안 로직으로 넘어감
-            pass
-            
+
+        return None
+
+    async def _suggest_level(self, user: User, questions_for_level: List[str]) -> Optional[dict]:
         # ----------------------------------------
         # 2. 난이도 변경 제안 로직 (LLM(Kanana) 사용)
-        # (관심 분야 변경 제안이 없었을 경우에만 실행)
         # ----------------------------------------
-        questions_for_level = analysis_data['recent_level_questions']
         current_level = user.level or "beginner"
         
         # 난이도 Advice Agent 프롬프트
-        level_prompt = f"""
-        [사용자 프로필]
-        - 현재 학습 레벨: {current_level}
-        
-        [최근 3개 논문에 대한 질문 9개]
-        - 질문 목록: {'; '.join(questions_for_level) or '질문 기록 없음'}
-        ---
-        
-        당신은 **친절한 전문 멘토 AI**입니다. 사용자의 최근 질문 목록을 분석하여 **이해도의 점수 (comprehension_scoring)**를 1부터 100 사이의 숫자로 매기고, 현재 레벨보다 **높은 레벨로 상향 조정 (suggest higher level)**이 필요한지 판단하세요.
-        
-        * **상향 조정 기준:** 질문의 깊이, 전문성, 복잡도를 종합적으로 고려합니다. (예: 단순 용어 질문 < 개념 간 관계 질문 < 한계나 확장 질문)
-        * **상향 조정 임계값:** Beginner에서 Intermediate로 제안은 70점 이상, Intermediate에서 Advanced로 제안은 80점 이상일 때 고려합니다.
-        
-        분석 결과에 따라 다음 중 하나의 JSON 형식으로만 응답하세요.
-        
-        1. **레벨 상향을 제안해야 하는 경우 (answer > threshold):**
-        {{
-            "advice_type": "level_change",
-            "comprehension_score": "분석된 이해도 점수 (1~100)",
-            "suggested_level": "intermediate" | "advanced",
-            "reason": "**친절하고 부드러운 대화체(말 끝에 '~네요', '~하셨어요' 등 사용)**를 기반으로 제안형 어투를 사용하여 2~3줄 이내의 상향 제안 이유. 이유의 마지막 문장을 반드시 '학습 레벨을 [suggested_level]로 상향 조정해 보시겠어요?'와 같이 구체적인 액션을 유도하는 질문형으로 마무리하세요."
-        }}
-        
-        2. **레벨을 유지해야 하는 경우:**
-        {{
-            "advice_type": "none",
-            "message": "전문 멘토의 말투로 **제안형 어투('~해보시는 게 좋겠어요', '~하는 것이 어떨까요?')를 사용하여** 2~3줄 이내의 레벨 유지 제안 이유"
-        }}
-        
-        질문이 3개 미만이거나 레벨이 'advanced'인 경우 레벨 변경을 제안하지 않습니다.
-        """
+        level_prompt = LEVEL_PROMPT_TMPL.format(
+            current_level=current_level,
+            questions_joined='; '.join(questions_for_level) or '질문 기록 없음'
+        )
+
+        try:
+            # Kanana 호출
+            level_advice_raw = await call_kanana_async(
+                level_prompt,
+                system_prompt=LEVEL_ADVICE_SYSTEM_PROMPT,
+                max_tokens=LEVEL_ADVICE_MAX_TOKENS
+            )
 
-        if len(questions_for_level) >= 3 and current_level != "advanced":
-            try:
-                # Kanana 호출
-                level_advice_raw = call_kanana(level_prompt)
+            # 💡 로그 추가: Kanana 원시 응답 확인
+            print(f"--- Kanana (난이도) 원시 응답 시작 ---")
+            print(level_advice_raw)
+            print(f"--- Kanana (난이도) 원시 응답 끝 ---")
+            
+            # JSON 파싱
+            level_advice = _extract_json(level_advice_raw)
 
-                # 💡 로그 추가: Kanana 원시 응답 확인
-                print(f"--- Kanana (난이도) 원시 응답 시작 ---")
-                print(level_advice_raw)
-                print(f"--- Kanana (난이도) 원시 응답 끝 ---")
+            # 난이도 변경 제안이 있을 경우 반환
+            if level_advice.get("advice_type") == "level_change":
+                suggested_level = level_advice['suggested_level']
                 
-                # JSON 파싱
-                match = re.search(r"(\{.*?\}|\`\`\`json\s*(\{.*?\})\s*\`\`\`)", level_advice_raw, re.DOTALL)
+                # LLM이 제안한 레벨이 유효한지 확인하고 현재 레벨보다 높은지 확인
+                if suggested_level in ["intermediate", "advanced"] and suggested_level != current_level:
+                    return {
+                        "advice_type": "level_change",
+                        "current_level": current_level,
+                        "suggested_level": suggested_level,
+                        "reason": level_advice['reason'],
+                        "comprehension_score": level_advice['comprehension_score']
+                    }
 
-                if match:
-                    # 캡처 그룹 2 (마크다운 내부 JSON)가 있으면 사용, 없으면 캡처 그룹 1 (일반 JSON) 사용
-                    json_string = match.group(2) if match.group(2) else match.group(1) 
-    
-                    try:
-                        level_advice = json.loads(json_string)
-                    except json.JSONDecodeError as json_e:
-                        # JSON 포맷은 찾았지만, 내부 구조가 깨진 경우
-                        raise ValueError(f"찾은 문자열은 JSON이 아니거나 형식이 올바르지 않습니다: {json_e}")
-                else:
-                    # JSON 객체나 마크다운 블록 자체를 찾지 못한 경우
-                    raise ValueError("LLM 응답에서 JSON을 찾을 수 없습니다.")
-
-                # 난이도 변경 제안이 있을 경우 즉시 반환 (워크플로우 흐름)
-                if level_advice.get("advice_type") == "level_change":
-                    suggested_level = level_advice['suggested_level']
-                    
-                    # LLM이 제안한 레벨이 유효한지 확인하고 현재 레벨보다 높은지 확인
-                    if suggested_level in ["intermediate", "advanced"] and suggested_level != current_level:
-                        return {
-                            "advice_type": "level_change",
-                            "current_level": current_level,
-                            "suggested_level": suggested_level,
-                            "reason": level_advice['reason'],
-                            "comprehension_score": level_advice['comprehension_score']
-                        }
-
-            except Exception as e:
-                print(f"Kanana (난이도) 호출 또는 파싱 중 에러 발생: {e}")
-                # 에러 발생 시 조언 없음 로직으로 넘어감
-                pass
+        except Exception as e:
+            print(f"Kanana (난이도) 호출 또는 파싱 중 에러 발생: {e}")
 
-        # ----------------------------------------
-        # 3. 조언 없음 (두 LLM Agent 모두 변경 제안이 없었을 경우)
-        # ----------------------------------------
-        return {
-            "advice_type": "none",
-            "message": "오늘도 열심히 논문 공부를 해보아요! 현재 학습 방향이 매우 좋습니다."
-        }
+        return None
 
 
     async def generate_study_advice(
         self,
         db: Session,
         user_id: int
-    ) -> str:
+    ) -> AsyncIterator[str]:
 
         """
         사용자 정보를 기반으로 학습 조언을 생성하고 실시간 응답합니다.
         (LLM을 통해 실질적인 학습 조언을 생성하도록 프롬프트 강화)
+        Kanana 응답을 스트리밍으로 받아 생성되는 조각을 바로 yield 합니다.
         """
 
-        user = db.query(User).filter(User.user_id == user_id).first()
+        user = self._get_user(db, user_id)
 
         if not user:
-            return "사용자 정보를 찾을 수 없어 조언을 드릴 수 없습니다."
+            yield "사용자 정보를 찾을 수 없어 조언을 드릴 수 없습니다."
+            return
 
         analysis_data = self._get_analysis_data(db, user_id)
 
         if analysis_data["total_read_count"] == 0:
-            return "아직 읽은 논문 기록이 없어 조언을 생성할 수 없습니다. 첫 논문을 읽어보시면 맞춤 조언을 드릴 수 있어요!"
+            yield "아직 읽은 논문 기록이 없어 조언을 생성할 수 없습니다. 첫 논문을 읽어보시면 맞춤 조언을 드릴 수 있어요!"
+            return
+
+        cache_key = _advice_cache_key("study", user, analysis_data)
+        cached = _advice_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
         
         # 1. 구조화된 조언 결과를 먼저 가져옵니다.
-        # analyze_and_suggest는 비동기 함수이므로 await 필요
-        structured_advice = await self.analyze_and_suggest(db, user_id)
+        # 이미 조회한 사용자/활동 데이터를 그대로 넘겨 DB를 다시 조회하지 않음
+        structured_advice = await self._structured_advice(user, analysis_data)
+
+        # 활동량이 적으면 Kanana 호출 없이 정해진 조언 문구로 응답
+        if (
+            analysis_data['keyword_count'] < LOW_ACTIVITY_MIN_KEYWORDS
+            and len(analysis_data['questions']) < LOW_ACTIVITY_MIN_QUESTIONS
+        ):
+            opening = LOW_ACTIVITY_OPENINGS.get(
+                structured_advice.get("advice_type"), LOW_ACTIVITY_OPENINGS["none"]
+            ).format(
+                suggested_interest=structured_advice.get("suggested_interest", ""),
+                suggested_level=structured_advice.get("suggested_level", "")
+            )
+            yield LOW_ACTIVITY_ADVICE_TMPL.format(opening=opening, username=user.username)
+            return
         
         advice_context = ""
         if structured_advice.get("advice_type") == "interest_change":
@@ -326,45 +577,34 @@ class AdviceAgent:
             advice_context = f"[현재 상태] 현재 학습 방향이 일치합니다. 멘토 의견: {message}"
 
         # 2. Kanana에 전달할 상세 프롬프트 구성(user.interest, user.level 사용)
-        prompt = f"""
-        [사용자 프로필]
-        - 이름: {user.username}
-        - 관심 분야: {user.interest or "미설정"}
-        - 희망 학습 레벨: {user.level or "미설정"}
-        - 총 논문 읽은 개수: {analysis_data['total_read_count']}개
-
-        [최근 1주간 활동 패턴 분석]
-        - 최근 다룬 키워드: {', '.join(set(analysis_data['keywords'])) or '키워드 없음 (읽은 논문 부족)'}
-        - 최근 챗봇 질문 내용 요약: {'; '.join(analysis_data['questions']) or '챗봇 질문 기록 없음'}
-
-        [구조화된 조언 결과]
-        {advice_context}
-        ---
-
-        당신은 사용자의 **성장을 돕는 전문 멘토 AI**입니다.
-        친절하고 **따뜻하며**, 사용자의 노력을 인정하고 동기 부여와 실천을 유도하는 **친근한 대화체와 제안형 말투**로 다음 4가지 코칭 요소를 모두 포함하는 **자연스러운 대화 형식**의 학습 코칭 메시지를 생성하세요.
-        
-
-        1. **조언 결과 통합:** [구조화된 조언 결과] 섹션의 내용을 **가장 먼저** 자연스러운 말투로 언급하며 시작하세요.
-        2. **집중도 코칭:** 최근 활동 키워드를 분석하여, 현재 관심 분야 내에서 **가장 깊이 파야 할 세부 주제**를 1~2개 꼽고, 관련 논문 1~2편을 더 찾아보도록 조언하세요. (관심 분야가 미설정이라면, 가장 자주 나온 키워드를 중심으로 주제를 확정하도록 조언)
-        3. **학습 효율성 조언:** 챗봇 질문의 경향(빈도 및 깊이)을 바탕으로, **현재 레벨({user.level or "미설정"})**에 맞게 **'논문을 읽는 방법'**이나 **'질문하는 습관'**을 개선할 수 있는 구체적인 팁을 제시하세요.
-        4. **다음 주 액션 플랜:** 다음 1주간 **정량적으로 달성 가능한 학습 목표**와 구체적인 **실천 방법**을 1~2가지 제시하세요. (예: "매일 15분 동안 읽은 논문의 핵심 구조를 마인드맵으로 정리하기" 또는 "세미나 자료를 만들듯 핵심 내용을 5줄 요약하는 연습하기")
-
-        메시지는 모든 정보를 담으면서도 2줄 내외의 간결한 길이로 유지해주세요.
-        """
+        prompt = STUDY_PROMPT_TMPL.format(
+            username=user.username,
+            interest=user.interest or "미설정",
+            level=user.level or "미설정",
+            total_read_count=analysis_data['total_read_count'],
+            keywords_joined=", ".join(analysis_data['keywords']) or '키워드 없음 (읽은 논문 부족)',
+            questions_joined='; '.join(analysis_data['questions']) or '챗봇 질문 기록 없음',
+            advice_context=advice_context
+        )
 
-        # 2. Kanana 함수 호출
+        # 2. Kanana 스트리밍 호출
+        # 3. DB 저장 없이 실시간 응답 (Agent 정의에 따라 저장 로직 제거)
+        chunks = []
         try:
-            advice = call_kanana(prompt, max_tokens=100)
-
-            if not advice:
-                advice = "Kanana 모델이 현재 사용자에게 맞는 조언을 생성하지 못했습니다."
+            stream = call_kanana_stream_async(prompt, system_prompt=STUDY_ADVICE_SYSTEM_PROMPT, max_tokens=100)
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
 
         except Exception as e:
             print(f"Kanana 호출 중 에러 발생: {e}")
-            advice = "API 호출 중 시스템 오류가 발생했습니다. (조언 실패)"
-
-        # 3. DB 저장 없이 실시간 응답 (Agent 정의에 따라 저장 로직 제거)
-        return advice
+            if not chunks:
+                yield "API 호출 중 시스템 오류가 발생했습니다. (조언 실패)"
+            return
+
+        if chunks:
+            _advice_cache[cache_key] = "".join(chunks)
+        else:
+            yield "Kanana 모델이 현재 사용자에게 맞는 조언을 생성하지 못했습니다."
 
 advice_agent = AdviceAgent()
\ No newline at end of file
@@ -1,12 +1,76 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models import Paper, PaperMetadata, ChatHistory 
-from app.utils.kanana import call_kanana
-from typing import List, Optional
+from app.database import SessionLocal
+from app.utils.kanana import call_kanana_async, call_kanana_stream_async, SYSTEM_PROMPT, PROMPT_TEXT_MAX_CHARS
+from app.utils.response_cache import ResponseCache
+from typing import AsyncIterator, List, Optional
 from fastapi.concurrency import run_in_threadpool
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 같은 논문에 대한 같은 질문은 Kanana를 다시 호출하지 않고 이전 답변을 재사용
+# (이전 대화가 있는 질문은 답변이 대화 맥락에 따라 달라지므로 캐시하지 않음)
+_response_cache = ResponseCache()
+
+# 프롬프트에 넣는 이전 대화 수 (최신 Q&A 2개)
+HISTORY_TURNS = 2
+# get_chat_history 기본 최대 조회 수
+CHAT_HISTORY_MAX = 50
+
+# ------------------------------------
+# 프롬프트
+# ------------------------------------
+# 고정 지시문은 system 메시지, 논문 본문은 user 메시지의 맨 앞에 둡니다.
+# [system][논문 본문][이전 대화 + 새 질문] 순서라 같은 논문이면 본문까지의 prefix가 항상 동일합니다.
+CHATBOT_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+당신은 사용자 메시지로 주어지는 '논문 내용'과 '이전 대화'를 기반으로 '사용자의 새 질문'에 답해야 하는 논문 분석 AI입니다.
+**외부 정보는 절대 사용하지 마세요.** 오직 주어진 논문 내용과 대화 맥락만으로 답변을 생성해야 합니다.
+
+또한, 답변은 반드시 다음 두 부분으로 구성해야 합니다:
+
+1) **답변(Answer)**: 사용자의 질문에 대한 명확하고 친절한 설명
+2) **근거(Evidence)**: '논문 내용'에서 직접 발췌한 문장 또는 문단. 
+   - 임의로 생성하지 말고, 반드시 주어진 논문 텍스트에서 그대로 가져와야 합니다.
+   - 사용된 근거가 어떤 질문 부분을 뒷받침하는지 간단히 설명해주세요.
+
+출력 형식은 아래 템플릿을 따르세요:
+
+[답변]
+(여기에 사용자의 질문에 대한 설명을 작성)
+
+[근거]
+- 원문 발췌: "..."
+- 설명: 이 문장이 위 답변의 ○○ 내용을 뒷받침함."""
+
+CHAT_PROMPT_TMPL = """--- 논문 내용 (Paper full text) ---
+{text_preview}
+----------------------------------
+
+--- 이전 대화 (Context) ---
+{history_text}
+----------------------------------
+
+--- 새 질문 ---
+{question}
+----------------------------------
+
+위 논문 텍스트와 이전 대화 내용을 기반으로 템플릿 형식에 맞춰 답변을 생성하세요."""
+
+# 고정 프롬프트(system + 템플릿)의 해시를 한 번만 계산해 prefix 캐시 키에 포함
+# (프롬프트를 수정하면 키가 바뀌어 이전 프롬프트로 만든 캐시와 섞이지 않음)
+_CHAT_PROMPT_HASH = hashlib.blake2b(
+    (CHATBOT_SYSTEM_PROMPT + CHAT_PROMPT_TMPL).encode("utf-8"), digest_size=8
+).hexdigest()
+
+
+def _chat_cache_key(paper_id: int) -> str:
+    """일반/스트리밍 답변이 같은 논문이면 같은 prefix 캐시 키를 쓰도록 한 곳에서 생성"""
+    return f"chat:{_CHAT_PROMPT_HASH}:paper:{paper_id}"
+
 # ------------------------------------
 # Agent 객체 정의
 # ------------------------------------
@@ -19,13 +83,21 @@ class ChatbotAgent:
 
     def _get_paper_full_text(self, db: Session, paper_id: int) -> Optional[str]:
         """
-        주어진 논문 ID를 사용하여 데이터베이스에서 PaperMetadata의 full_text를 조회합니다.
-        Paper와 PaperMetadata는 1:1 관계입니다.
+        주어진 논문 ID를 사용하여 데이터베이스에서 프롬프트용 논문 본문을 조회합니다.
+        수집 시점에 잘라둔 PaperMetadata.prompt_text를 사용하고,
+        prompt_text가 없는 예전 데이터는 DB에서 full_text 앞부분만 잘라서 가져옵니다.
         """
         try:
-            paper = db.query(Paper).filter(Paper.paper_id == paper_id).first()
-            if paper and paper.paper_metadata:
-                return paper.paper_metadata.full_text
+            return (
+                db.query(
+                    func.coalesce(
+                        PaperMetadata.prompt_text,
+                        func.substr(PaperMetadata.full_text, 1, PROMPT_TEXT_MAX_CHARS)
+                    )
+                )
+                .filter(PaperMetadata.paper_id == paper_id)
+                .scalar()
+            )
             
         except Exception as e:
             logger.error(f"논문 ID {paper_id}의 full_text 조회 중 DB 오류 발생: {e}", exc_info=True)
@@ -37,17 +109,22 @@ class ChatbotAgent:
         """
         ChatHistory 객체 리스트를 LLM 프롬프트용 텍스트 형식으로 변환합니다.
         """
-        if not history:
-            return "없음"
-        
-        recent_history = history[-2:]
-        
-        formatted_text = ""
-        for i, chat in enumerate(recent_history):
-            formatted_text += f"Q{i+1}: {chat.question}\n"
-            formatted_text += f"A{i+1}: {chat.answer}\n"
-            
-        return formatted_text.strip()
+        recent_history = history[-HISTORY_TURNS:]
+        return "\n".join(
+            f"Q{i+1}: {chat.question}\nA{i+1}: {chat.answer}"
+            for i, chat in enumerate(recent_history)
+        ) or "없음"
+
+    def _build_prompt(self, full_text: str, relevant_history: Optional[List[ChatHistory]], question: str) -> str:
+        """
+        논문 본문을 맨 앞에 두어 같은 논문에 대한 요청들이 동일한 prefix를 공유하도록 구성
+        (이전 대화/새 질문은 본문 뒤에만 붙음)
+        """
+        return CHAT_PROMPT_TMPL.format(
+            text_preview=full_text,
+            history_text=self._format_history_for_prompt(relevant_history or []),
+            question=question
+        )
 
 
     async def generate_response(
@@ -64,69 +141,114 @@ class ChatbotAgent:
         full_text는 MAX_TEXT_LENGTH에 맞게 잘라서 사용합니다.
         """
 
-        # 1. DB에서 논문 정보 및 텍스트 가져오기 (paper_metadata.full_text 조회)
-        full_text = self._get_paper_full_text(db, paper_id)
+        # 1. 캐시 확인 (이전 대화가 없는 질문만, 적중 시 본문 조회/프롬프트 구성/LLM 호출 모두 생략)
+        # ChatHistory 기록은 적중 여부와 관계없이 동일하게 남김
+        use_cache = not relevant_history
+        answer = _response_cache.get(paper_id, question) if use_cache else None
+        if answer is not None:
+            logger.info(f"답변 캐시 적중: Paper {paper_id}")
+        else:
+            # 2. DB에서 논문 정보 및 텍스트 가져오기 (paper_metadata.full_text 조회)
+            # 동기 Session 호출은 스레드풀에서 실행해 이벤트 루프를 막지 않음
+            full_text = await run_in_threadpool(self._get_paper_full_text, db, paper_id)
+            
+            if not full_text:
+                return await run_in_threadpool(
+                    self._save_chat, db, user_id, paper_id, question,
+                    "현재 이 논문의 full text가 등록되어 있지 않아 답변을 생성할 수 없습니다."
+                )
+            
+            # 3. Kanana에 전달할 프롬프트 구성 후 호출 (비동기 클라이언트로 직접 await)
+            prompt = self._build_prompt(full_text, relevant_history, question)
+            try:
+                answer = await call_kanana_async(
+                    prompt,
+                    system_prompt=CHATBOT_SYSTEM_PROMPT,
+                    cache_key=_chat_cache_key(paper_id)
+                )
+                if answer:
+                    if use_cache:
+                        _response_cache.put(paper_id, question, answer)
+                else:
+                    answer = "Kanana 모델에서 답변을 생성하지 못했습니다."
+            except Exception as e:
+                logging.error(f"Kanana 호출 중 에러 발생: {e}", exc_info=True)
+                answer = "API 호출 중 시스템 오류가 발생했습니다."
+
+        # 4. ChatHistory에 저장
+        return await run_in_threadpool(self._save_chat, db, user_id, paper_id, question, answer)
+
+    async def stream_response(
+        self,
+        db: Session,
+        user_id: int,
+        paper_id: int,
+        question: str,
+        relevant_history: List[ChatHistory] = None
+    ) -> AsyncIterator[str]:
+        """
+        generate_response의 스트리밍 버전. 답변 조각을 생성되는 대로 yield합니다.
+        ChatHistory 저장은 스트림이 끝난 뒤 호출하는 쪽에서 save_chat_in_new_session으로 수행합니다.
+        """
+        # 캐시 적중 시 본문 조회 없이 저장된 답변을 한 번에 전달 (이전 대화가 없는 질문만)
+        use_cache = not relevant_history
+        answer = _response_cache.get(paper_id, question) if use_cache else None
+        if answer is not None:
+            logger.info(f"답변 캐시 적중: Paper {paper_id}")
+            yield answer
+            return
+        
+        full_text = await run_in_threadpool(self._get_paper_full_text, db, paper_id)
         
         if not full_text:
-            return ChatHistory(
-                user_id=user_id,
-                paper_id=paper_id,
-                question=question,
-                answer="현재 이 논문의 full text가 등록되어 있지 않아 답변을 생성할 수 없습니다."
-            )
+            yield "현재 이 논문의 full text가 등록되어 있지 않아 답변을 생성할 수 없습니다."
+            return
         
-        # 2. Kanana에 전달할 프롬프트 구성
-        text_preview = full_text
-        history_text = self._format_history_for_prompt(relevant_history or [])
+        prompt = self._build_prompt(full_text, relevant_history, question)
+        pieces = []
+        async for piece in call_kanana_stream_async(
+            prompt,
+            system_prompt=CHATBOT_SYSTEM_PROMPT,
+            cache_key=_chat_cache_key(paper_id)
+        ):
+            pieces.append(piece)
+            yield piece
         
-        prompt = f"""
-당신은 아래 주어진 '논문 내용'과 '이전 대화'를 기반으로 '사용자의 새 질문'에 답해야 하는 논문 분석 AI입니다.
-**외부 정보는 절대 사용하지 마세요.** 오직 주어진 논문 내용과 대화 맥락만으로 답변을 생성해야 합니다.
-
-또한, 답변은 반드시 다음 두 부분으로 구성해야 합니다:
-
-1) **답변(Answer)**: 사용자의 질문에 대한 명확하고 친절한 설명
-2) **근거(Evidence)**: 위 '논문 내용'에서 직접 발췌한 문장 또는 문단. 
-   - 임의로 생성하지 말고, 반드시 주어진 논문 텍스트에서 그대로 가져와야 합니다.
-   - 사용된 근거가 어떤 질문 부분을 뒷받침하는지 간단히 설명해주세요.
-
-출력 형식은 아래 템플릿을 따르세요:
-
-[답변]
-(여기에 사용자의 질문에 대한 설명을 작성)
-
-[근거]
-- 원문 발췌: "..."
-- 설명: 이 문장이 위 답변의 ○○ 내용을 뒷받침함.
-
-----------------------------------
-
---- 논문 내용 (Paper full text) ---
-{text_preview}
-----------------------------------
+        answer = "".join(pieces)
+        if answer:
+            if use_cache:
+                _response_cache.put(paper_id, question, answer)
+        else:
+            yield "Kanana 모델에서 답변을 생성하지 못했습니다."
 
---- 이전 대화 (Context) ---
-{history_text}
-----------------------------------
-
---- 새 질문 ---
-{question}
-----------------------------------
-
-위 논문 텍스트와 이전 대화 내용을 기반으로 위 템플릿 형식에 맞춰 답변을 생성하세요.
-"""
-
-    
-        # 3. Kanana 함수 호출 (동기 함수 call_kanana 호출)
+    def save_chat_in_new_session(
+        self,
+        user_id: int,
+        paper_id: int,
+        question: str,
+        answer: str
+    ) -> Optional[ChatHistory]:
+        """
+        요청 세션과 별개의 새 세션으로 ChatHistory 저장 (스트리밍 응답 종료 후 호출용)
+        """
+        db = SessionLocal()
         try:
-            answer = await run_in_threadpool(call_kanana, prompt)
-            if not answer:
-                answer = "Kanana 모델에서 답변을 생성하지 못했습니다."
-        except Exception as e:
-            logging.error(f"Kanana 호출 중 에러 발생: {e}", exc_info=True)
-            answer = "API 호출 중 시스템 오류가 발생했습니다."
+            new_chat = self._save_chat(db, user_id, paper_id, question, answer)
+            if new_chat:
+                db.expunge(new_chat)
+            return new_chat
+        finally:
+            db.close()
 
-        # 4. ChatHistory에 저장
+    def _save_chat(
+        self,
+        db: Session,
+        user_id: int,
+        paper_id: int,
+        question: str,
+        answer: str
+    ) -> Optional[ChatHistory]:
+        """ChatHistory 저장 (동기 DB 작업)"""
         try:
             new_chat = ChatHistory(
                 user_id=user_id,
@@ -141,21 +263,24 @@ class ChatbotAgent:
         except Exception as e:
             logger.error(f"ChatHistory 저장 중 DB 오류 발생: User {user_id}, Paper {paper_id}, Error: {e}", exc_info=True)
             db.rollback()
+            return None
 
     def get_chat_history(
         self,
         db: Session,
         user_id: int,
-        paper_id: int
+        paper_id: int,
+        limit: int = CHAT_HISTORY_MAX
     ) -> List[ChatHistory]:
         """
-        특정 논문에 대한 이전 채팅 기록을 반환합니다.
+        특정 논문에 대한 이전 채팅 기록을 반환합니다. (오래된 순)
+        최신 limit개만 DB에서 가져옵니다. (ix_chat_user_paper_created 인덱스 범위 조회)
         """
         history = db.query(ChatHistory).filter(
             ChatHistory.user_id == user_id,
             ChatHistory.paper_id == paper_id
-        ).order_by(ChatHistory.created_at.asc()).all()
-        
+        ).order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(limit).all()
+        history.reverse()
         return history
 
 chatbot_agent = ChatbotAgent()
\ No newline at end of file
@@ -1,102 +1,150 @@
-from typing import Dict, Optional
-import json
-from sqlalchemy.orm import Session
-from app.utils.kanana import call_kanana
-from app.models import Paper, PaperMetadata
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from app.utils.kanana import call_kanana, truncate_to_tokens, PROMPT_TEXT_MAX_CHARS
+from app.models import Paper, PaperMetadata, parse_authors
 
+# 요약 앞부분과 초록 앞부분의 유사도가 이 값 이상이면 초록을 베낀 것으로 판단
+COPY_SIMILARITY_THRESHOLD = 0.8
+# 재생성 시에는 같은 결과가 반복되지 않도록 temperature를 조금 올림
+RETRY_TEMPERATURE = 0.4
+# 요약 프롬프트에 넣는 본문/초록의 토큰 예산
+SUMMARY_CONTENT_MAX_TOKENS = 512
 
-class PaperDescriptionAgent:
-    """논문 설명 Agent: 사용자 난이도에 맞춘 초록 요약 생성"""
-    
-    def __init__(self, db: Optional[Session] = None):
-        self.db = db
-        # 난이도별 요약 스타일 프롬프트
-        self.level_prompts = {
-            "beginner": """다음 논문을 초보자가 이해할 수 있도록 200-300자 이내로 요약해주세요.
+# 난이도별 요약 스타일 프롬프트
+LEVEL_PROMPTS = {
+    "beginner": """다음 논문을 초보자가 이해할 수 있도록 200-300자 이내로 요약해주세요.
 
 요구사항:
 - 논문이 해결하려는 문제를 한 문장으로 설명
 - 제안하는 방법이나 아이디어를 쉽게 설명
 - 왜 중요한지 간단히 설명
 - 전문 용어는 괄호 안에 쉬운 설명 추가
+- 요약 앞부분이 원문 초록과 동일하면 안 됨. 원문과 같은 표현을 연속 15자 이상 사용하지 말 것
 - 마크다운 강조 표시(**, ##, ---)를 사용하지 말 것
 - 자연스러운 문장으로 작성""",
-            
-            "intermediate": """다음 논문을 중급자가 이해할 수 있도록 300-400자 이내로 요약해주세요.
+    
+    "intermediate": """다음 논문을 중급자가 이해할 수 있도록 300-400자 이내로 요약해주세요.
 
 요구사항:
 - 논문의 핵심 기여 2-3가지
 - 주요 방법론이나 접근 방식
 - 기존 연구와의 차별점
+- 요약 앞부분이 원문 초록과 동일하면 안 됨. 원문과 같은 표현을 연속 15자 이상 사용하지 말 것
 - 마크다운 강조 표시(**, ##, ---)를 사용하지 말 것
 - 자연스러운 문장으로 작성""",
-            
-            "advanced": """다음 논문을 고급자가 이해할 수 있도록 300-400자 이내로 요약해주세요.
+    
+    "advanced": """다음 논문을 고급자가 이해할 수 있도록 300-400자 이내로 요약해주세요.
 
 요구사항:
 - 핵심 기술적 기여를 압축적으로 정리
 - 방법론의 기술적 세부사항과 혁신점
 - 연구의 한계나 향후 방향성
+- 요약 앞부분이 원문 초록과 동일하면 안 됨. 원문과 같은 표현을 연속 15자 이상 사용하지 말 것
 - 마크다운 강조 표시(**, ##, ---)를 사용하지 말 것
 - 자연스러운 문장으로 작성"""
-        }
+}
+
+# 요약 프롬프트 템플릿 (난이도별 지시문을 미리 붙여둔 완성 템플릿, 요청마다 .format으로 값만 채움)
+SUMMARY_PROMPT_TMPLS = {
+    level: level_prompt + """
+
+논문 제목: {title}
+저자: {authors}
+초록:
+{content}
+
+위 내용을 바탕으로 요약을 작성해주세요."""
+    for level, level_prompt in LEVEL_PROMPTS.items()
+}
+
+
+class PaperDescriptionAgent:
+    """논문 설명 Agent: 사용자 난이도에 맞춘 초록 요약 생성"""
+    
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db
+        # 한 번 조회한 논문 정보 캐시 (paper_id -> dict), 파이프라인 실행마다 clear_cache()로 초기화
+        self._paper_cache: Dict[int, Dict] = {}
+    
+    def clear_cache(self):
+        """논문 정보 캐시 초기화"""
+        self._paper_cache.clear()
     
     def _get_paper_from_db(self, paper_id: int) -> Optional[Dict]:
-        """DB에서 논문 정보 + 메타데이터(full_text) 가져오기"""
+        """DB에서 논문 정보 + 메타데이터(프롬프트용 본문) 가져오기"""
         if not self.db:
             return None
         
-        paper = (
-            self.db.query(Paper)
+        if paper_id in self._paper_cache:
+            return dict(self._paper_cache[paper_id])
+        
+        # 논문 + 메타데이터를 JOIN 한 번으로 조회 (필요한 컬럼만, full_text 원문은 가져오지 않음)
+        row = (
+            self.db.query(
+                Paper.paper_id,
+                Paper.title,
+                Paper.authors,
+                Paper.abstract,
+                PaperMetadata.summary_level,
+                PaperMetadata.summary_content,
+                func.coalesce(
+                    PaperMetadata.prompt_text,
+                    func.substr(PaperMetadata.full_text, 1, PROMPT_TEXT_MAX_CHARS)
+                ).label("prompt_text")
+            )
+            .outerjoin(PaperMetadata, PaperMetadata.paper_id == Paper.paper_id)
             .filter(Paper.paper_id == paper_id)
             .first()
         )
-        if not paper:
+        if not row:
             return None
         
-        metadata = (
-            self.db.query(PaperMetadata)
-            .filter(PaperMetadata.paper_id == paper_id)
-            .first()
-        )
-        
+        paper_dict = {
+            "paper_id": row.paper_id,
+            "title": row.title,
+            "authors": parse_authors(row.authors),
+            "abstract": row.abstract,
+            "prompt_text": row.prompt_text,
+            "summary_level": row.summary_level,
+            "summary_content": row.summary_content,
+        }
+        self._paper_cache[paper_id] = paper_dict
+        return dict(paper_dict)
+    
+    def _paper_to_dict(self, paper: Paper, metadata: Optional[PaperMetadata]) -> Dict:
         return {
             "paper_id": paper.paper_id,
             "title": paper.title,
-            "authors": json.loads(paper.authors) if paper.authors else [],
+            "authors": paper.authors_list,
             "abstract": paper.abstract,
-            "full_text": metadata.full_text if metadata else None,
+            "prompt_text": metadata.prompt_text if metadata else None,
+            "summary_level": metadata.summary_level if metadata else None,
+            "summary_content": metadata.summary_content if metadata else None,
         }
     
-    def generate_summary(self, paper: Dict, level: str = "intermediate") -> str:
+    def generate_summary(self, paper: Dict, level: str = "intermediate", temperature: float = 0.2) -> str:
         """난이도별 맞춤 요약 생성 (단일 LLM 호출)"""
         title = paper.get("title", "")
         abstract = paper.get("abstract", "") or ""
-        authors = paper.get("authors", [])
-        if isinstance(authors, list):
-            authors = ", ".join(authors[:3])
-            if len(paper.get("authors", [])) > 3:
+        author_list = paper.get("authors", [])
+        authors = author_list
+        if isinstance(author_list, list):
+            authors = ", ".join(author_list[:3])
+            if len(author_list) > 3:
                 authors += " 외"
         
         # full_text가 있으면 더 풍부한 내용 기반으로 요약
-        full_text = paper.get("full_text", "") or ""
-        content = full_text[:2000] if full_text else abstract[:1000]
+        # (수집 시점에 잘라둔 prompt_text가 있으면 원문 전체 대신 사용)
+        full_text = paper.get("prompt_text") or paper.get("full_text", "") or ""
+        content = truncate_to_tokens(full_text or abstract, SUMMARY_CONTENT_MAX_TOKENS)
         
-        level_prompt = self.level_prompts.get(
-            level,
-            self.level_prompts["intermediate"],
-        )
-        
-        prompt = f"""{level_prompt}
-
-논문 제목: {title}
-저자: {authors}
-초록:
-{content}
-
-위 내용을 바탕으로 요약을 작성해주세요."""
+        prompt_tmpl = SUMMARY_PROMPT_TMPLS.get(level, SUMMARY_PROMPT_TMPLS["intermediate"])
+        prompt = prompt_tmpl.format(title=title, authors=authors, content=content)
         
-        summary = call_kanana(prompt, temperature=0.2, max_tokens=512)
+        summary = call_kanana(prompt, temperature=temperature, max_tokens=512)
         return summary.strip()
     
     def validate_quality(self, summary: str, abstract: str) -> bool:
@@ -112,11 +160,10 @@ class PaperDescriptionAgent:
         head_abstract = (abstract or "")[:200].strip()
         head_summary = summary[:200].strip()
         
-        # 앞부분 200자가 완전히 동일하거나,
-        # 초록 앞 150자가 요약 안에 그대로 포함되어 있으면 실패
+        # 앞부분 200자의 유사도(편집 거리 기반)가 임계값 이상이면 실패
+        # (부분 문자열 일치만으로 판단하면 짧은 공통 구절에도 불필요한 재생성이 발생)
         if head_abstract and (
-            head_summary == head_abstract
-            or head_abstract[:150] in summary
+            SequenceMatcher(None, head_abstract, head_summary).ratio() >= COPY_SIMILARITY_THRESHOLD
         ):
             return False
         
@@ -126,20 +173,21 @@ class PaperDescriptionAgent:
         self,
         paper: Dict,
         level: str = "intermediate",
-        max_retries: int = 2,
+        max_retries: int = 1,
     ) -> str:
-        """품질 검증 후 필요시 재생성"""
+        """품질 검증 후 필요시 재생성 (검증 실패 시에만 최대 max_retries회 재호출)"""
         abstract = paper.get("abstract", "") or ""
-        summary = ""
+        summary = self.generate_summary(paper, level)
         
         for attempt in range(max_retries):
-            summary = self.generate_summary(paper, level)
-            
             if self.validate_quality(summary, abstract):
                 return summary
             
-            if attempt < max_retries - 1:
-                print(f"요약 품질 검증 실패, 재생성 시도 {attempt + 2}/{max_retries}")
+            print(f"요약 품질 검증 실패, 재생성 시도 {attempt + 1}/{max_retries}")
+            summary = self.generate_summary(paper, level, temperature=RETRY_TEMPERATURE)
+        
+        if not self.validate_quality(summary, abstract):
+            print(f"요약 품질 검증 최종 실패: {paper.get('title', 'Unknown')[:50]}")
         
         # 최종 시도 실패 시 마지막 생성 결과 또는 기본 메시지 반환
         return summary if summary else "요약 생성에 실패했습니다."
@@ -164,25 +212,40 @@ class PaperDescriptionAgent:
             metadata.summary_content = summary
             
             self.db.commit()
+            
+            cached = self._paper_cache.get(paper_id)
+            if cached:
+                cached.update(summary_level=level, summary_content=summary)
         except Exception as e:
             self.db.rollback()
             print(f"요약 저장 오류: {e}")
     
-    def describe(self, paper: Dict, level: str = "intermediate") -> Dict:
+    def describe(self, paper: Dict, level: str = "intermediate", force: bool = False) -> Dict:
         """
         논문 설명 생성 (최종 메서드)
         - paper dict에 paper_id / db_paper_id가 있으면 DB에서 full_text를 보강
+        - 같은 난이도의 요약이 이미 저장되어 있으면 LLM 호출 없이 그대로 반환 (force=True면 재생성)
         - 요약 생성 + 품질 검증
         - 메타데이터에 요약 저장
         """
         paper_id = paper.get("db_paper_id") or paper.get("paper_id")
+        has_text = bool(paper.get("full_text") or paper.get("prompt_text"))
         
-        # DB에 저장된 full_text/abstract로 보강
-        if paper_id and self.db:
+        # 저장된 요약 확인 + DB에 저장된 본문/abstract로 보강 (이미 본문이 있고 force면 조회 생략)
+        if paper_id and self.db and not (has_text and force):
             db_paper = self._get_paper_from_db(paper_id)
             if db_paper:
-                # 외부에서 넘겨준 paper 정보 위에 DB 정보를 덮어씀
-                paper.update(db_paper)
+                if not force and db_paper["summary_level"] == level and db_paper["summary_content"]:
+                    return {
+                        "paper_id": paper_id,
+                        "title": db_paper["title"] or paper.get("title", ""),
+                        "original_abstract": db_paper["abstract"] or paper.get("abstract", ""),
+                        "summary": db_paper["summary_content"],
+                        "level": level,
+                    }
+                if not has_text:
+                    # 외부에서 넘겨준 paper 정보 위에 DB 정보를 덮어씀
+                    paper.update(db_paper)
         
         summary = self.generate_with_validation(paper, level)
         
@@ -196,4 +259,103 @@ class PaperDescriptionAgent:
             "original_abstract": paper.get("abstract", ""),
             "summary": summary,
             "level": level,
-        }
\ No newline at end of file
+        }
+    
+    def try_generate(self, paper: Dict, level: str = "intermediate") -> Optional[str]:
+        """요약 생성 + 품질 검증 (DB 접근 없음, 실패 시 None) - 스레드에서 호출 가능"""
+        try:
+            return self.generate_with_validation(paper, level)
+        except Exception as e:
+            print(f"    ⚠️  요약 생성 실패: {paper.get('title', 'Unknown')[:50]} ({e})")
+            return None
+    
+    def describe_many(
+        self,
+        papers: List[Dict],
+        level: str = "intermediate",
+        summaries: Optional[List[Optional[str]]] = None,
+        force: bool = False
+    ) -> List[Dict]:
+        """
+        여러 논문 설명을 한 번에 생성 (파이프라인용)
+        - DB 조회: 논문 + 메타데이터를 IN 쿼리 1회로 조회
+        - 요약 생성: LLM 호출을 스레드풀에서 동시에 실행 (summaries가 주어지면 생략)
+        - 같은 난이도의 요약이 이미 저장된 논문은 생성하지 않음 (force=True면 재생성)
+        - DB 저장: 모든 요약을 한 번의 commit으로 저장
+        """
+        if not papers:
+            return []
+        
+        paper_ids = [p.get("db_paper_id") or p.get("paper_id") for p in papers]
+        
+        # 1. DB에 저장된 본문/abstract로 보강 (한 번에 조회)
+        # full_text 컬럼은 deferred라 읽지 않고, 수집 시 잘라둔 prompt_text를 사용
+        db_papers = {}
+        if self.db:
+            ids = [pid for pid in paper_ids if pid]
+            if ids:
+                rows = (
+                    self.db.query(Paper)
+                    .options(joinedload(Paper.paper_metadata))
+                    .filter(Paper.paper_id.in_(ids))
+                    .all()
+                )
+                db_papers = {row.paper_id: row for row in rows}
+        
+        for paper, paper_id in zip(papers, paper_ids):
+            db_paper = db_papers.get(paper_id)
+            if db_paper and not (paper.get("full_text") or paper.get("prompt_text")):
+                # 외부에서 넘겨준 paper 정보 위에 DB 정보를 덮어씀
+                paper_dict = self._paper_to_dict(db_paper, db_paper.paper_metadata)
+                self._paper_cache[paper_id] = paper_dict
+                paper.update(paper_dict)
+        
+        # 2. 요약 생성 + 품질 검증 (논문별 LLM 호출을 동시에 실행)
+        # 파이프라인에서 미리 생성한 요약이 넘어오면 생성 단계는 건너뜀
+        if summaries is None:
+            summaries = [None] * len(papers)
+            if not force:
+                for i, paper_id in enumerate(paper_ids):
+                    metadata = db_papers[paper_id].paper_metadata if paper_id in db_papers else None
+                    if metadata and metadata.summary_level == level and metadata.summary_content:
+                        summaries[i] = metadata.summary_content
+            
+            pending = [i for i, summary in enumerate(summaries) if summary is None]
+            if pending:
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    generated = executor.map(lambda i: self.try_generate(papers[i], level), pending)
+                    for i, summary in zip(pending, generated):
+                        summaries[i] = summary
+        
+        # 3. DB에 요약 저장 (한 번에 commit)
+        if self.db:
+            try:
+                for paper_id, summary in zip(paper_ids, summaries):
+                    if not paper_id or summary is None:
+                        continue
+                    
+                    db_paper = db_papers.get(paper_id)
+                    metadata = db_paper.paper_metadata if db_paper else None
+                    if not metadata:
+                        metadata = PaperMetadata(paper_id=paper_id)
+                        self.db.add(metadata)
+                    
+                    metadata.summary_level = level
+                    metadata.summary_content = summary
+                
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                print(f"요약 저장 오류: {e}")
+        
+        return [
+            {
+                "paper_id": paper_id or paper.get("arxiv_id", ""),
+                "title": paper.get("title", ""),
+                "original_abstract": paper.get("abstract", ""),
+                "summary": summary,
+                "level": level,
+            }
+            for paper, paper_id, summary in zip(papers, paper_ids, summaries)
+            if summary is not None
+        ]
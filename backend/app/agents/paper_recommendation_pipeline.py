@@ -3,7 +3,9 @@
 SearchAgent -> SelectionAgent -> PaperDescriptionAgent -> DB 저장
 """
 
+import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.agents.search_agent import SearchAgent
@@ -12,6 +14,11 @@ from app.agents.paper_description_agent import PaperDescriptionAgent
 from app.models import User, Recommendation
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# 요약 생성(Kanana 호출) 동시 실행 수 상한
+DESCRIPTION_MAX_WORKERS = 4
+
 
 class PaperRecommendationPipeline:
     """논문 추천 전체 파이프라인"""
@@ -33,111 +40,103 @@ class PaperRecommendationPipeline:
         Returns:
             dict: 실행 결과 요약
         """
-        print(f"\n{'='*60}")
-        print(f"📚 논문 추천 파이프라인 시작 (user_id={user_id})")
-        print(f"{'='*60}\n")
+        logger.info("pipeline start user_id=%d top_n=%d", user_id, top_n)
         
         # 1. 사용자 정보 가져오기
         user = self.db.query(User).filter(User.user_id == user_id).first()
         if not user:
-            print(f"❌ 사용자를 찾을 수 없습니다: user_id={user_id}")
+            logger.warning("user not found user_id=%d", user_id)
             return {"success": False, "error": "User not found"}
         
         interest = user.interest
         level = user.level or "intermediate"
         
-        print(f"👤 사용자: {user.username}")
-        print(f"🎯 관심 분야: {interest}")
-        print(f"📊 난이도: {level}")
-        print()
+        logger.info("user=%s interest=%s level=%s", user.username, interest, level)
         
         # 2. SearchAgent: 논문 검색
-        print(f"🔍 Step 1: 논문 검색 중...")
         try:
             candidate_papers = self.search_agent.search(
                 user_id=user_id,
                 max_results=20
             )
-            print(f"✅ 검색 완료: {len(candidate_papers)}편의 후보 논문 발견")
+            logger.info("step=search count=%d", len(candidate_papers))
         except Exception as e:
-            print(f"❌ 검색 실패: {e}")
+            logger.exception("step=search failed")
             return {"success": False, "error": str(e)}
         
         if not candidate_papers:
-            print("❌ 검색된 논문이 없습니다.")
+            logger.warning("step=search no papers found")
             return {"success": False, "error": "No papers found"}
         
-        print()
+        # 3. SelectionAgent + PaperDescriptionAgent: 논문 선정/PDF 처리와 요약 생성을 겹쳐서 실행
+        # 선정된 논문이 한 편씩 나올 때마다 요약 생성을 스레드풀에 넘기고, 다음 논문 PDF를 받는 동안 요약이 진행됨
+        self.description_agent.clear_cache()
+        selected_papers = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=DESCRIPTION_MAX_WORKERS) as executor:
+            try:
+                for paper in self.selection_agent.iter_selected_papers(
+                    candidate_papers=candidate_papers,
+                    interest=interest,
+                    level=level,
+                    top_n=top_n
+                ):
+                    selected_papers.append(paper)
+                    logger.debug("step=select paper %d/%d title=%.50s", len(selected_papers), top_n, paper.get("title", "Unknown"))
+                    futures.append(executor.submit(self.description_agent.try_generate, paper, level))
+            except Exception as e:
+                logger.exception("step=select failed")
+                for future in futures:
+                    future.cancel()
+                return {"success": False, "error": str(e)}
+            
+            generated = [future.result() for future in futures]
         
-        # 3. SelectionAgent: 최적 논문 선정 및 PDF 다운로드
-        print(f"📝 Step 2: 상위 {top_n}편 선정 및 PDF 다운로드 중...")
-        try:
-            selected_papers = self.selection_agent.select_papers(
-                candidate_papers=candidate_papers,
-                interest=interest,
-                level=level,
-                top_n=top_n
-            )
-            print(f"✅ 선정 완료: {len(selected_papers)}편")
-        except Exception as e:
-            print(f"❌ 선정 실패: {e}")
-            return {"success": False, "error": str(e)}
+        logger.info("step=select count=%d", len(selected_papers))
         
         if not selected_papers:
-            print("❌ 선정된 논문이 없습니다.")
+            logger.warning("step=select no papers selected")
             return {"success": False, "error": "No papers selected"}
         
-        print()
-        
-        # 4. PaperDescriptionAgent: 난이도별 요약 생성
-        print(f"✍️  Step 3: 난이도별 요약 생성 중 (level={level})...")
-        summaries = []
-        for i, paper in enumerate(selected_papers, 1):
-            print(f"  [{i}/{len(selected_papers)}] {paper.get('title', 'Unknown')[:50]}...")
-            try:
-                result = self.description_agent.describe(paper, level=level)
-                summaries.append(result)
-            except Exception as e:
-                print(f"    ⚠️  요약 생성 실패: {e}")
-                continue
+        # 생성된 요약은 메인 스레드에서 한 번에 DB에 저장
+        try:
+            summaries = self.description_agent.describe_many(
+                selected_papers, level=level, summaries=generated
+            )
+        except Exception:
+            logger.exception("step=describe save failed")
+            summaries = []
         
-        print(f"✅ 요약 완료: {len(summaries)}편")
-        print()
+        logger.info("step=describe count=%d level=%s", len(summaries), level)
         
-        # 5. Recommendation 테이블에 기록
-        print(f"💾 Step 4: Recommendation 테이블에 저장 중...")
-        saved_count = 0
+        # 4. Recommendation 테이블에 기록
+        now = datetime.utcnow()
+        rows = []
         for paper in selected_papers:
             paper_id = paper.get("db_paper_id")
             if not paper_id:
-                print(f"  ⚠️  paper_id 없음: {paper.get('title', 'Unknown')[:50]}")
+                logger.warning("step=save missing paper_id title=%.50s", paper.get("title", "Unknown"))
                 continue
             
-            try:
-                recommendation = Recommendation(
-                    user_id=user_id,
-                    paper_id=paper_id,
-                    recommended_at=datetime.utcnow(),
-                    is_user_requested=False
-                )
-                self.db.add(recommendation)
-                saved_count += 1
-            except Exception as e:
-                print(f"  ⚠️  Recommendation 저장 실패: {e}")
-                continue
-        
+            rows.append({
+                "user_id": user_id,
+                "paper_id": paper_id,
+                "recommended_at": now,
+                "is_user_requested": False
+            })
+        
+        # ORM 객체 생성 없이 INSERT 한 번으로 저장
         try:
+            self.db.bulk_insert_mappings(Recommendation, rows)
             self.db.commit()
-            print(f"✅ Recommendation 저장 완료: {saved_count}건")
+            saved_count = len(rows)
+            logger.info("step=save count=%d", saved_count)
         except Exception as e:
             self.db.rollback()
-            print(f"❌ Recommendation 커밋 실패: {e}")
+            logger.exception("step=save commit failed")
             return {"success": False, "error": str(e)}
         
-        print()
-        print(f"{'='*60}")
-        print(f"🎉 파이프라인 완료!")
-        print(f"{'='*60}\n")
+        logger.debug("pipeline done user_id=%d", user_id)
         
         # 결과 요약
         result = {
@@ -166,6 +165,8 @@ class PaperRecommendationPipeline:
 
 def main():
     """메인 실행 함수 (더미 데이터 생성용)"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    
     # DB 세션 생성
     db = SessionLocal()
     
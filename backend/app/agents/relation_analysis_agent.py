@@ -1,41 +1,39 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from app.utils.kanana import call_kanana
 from app.models import Paper, CitationGraph
+from app.utils import semantic_scholar
+from app.utils.arxiv_ids import canonical_arxiv_id
+
+# Semantic Scholar 동시 요청 수 상한 (rate limit 고려)
+SEMANTIC_SCHOLAR_MAX_WORKERS = 8
+# references.externalIds: 참고문헌의 arXiv ID로 DB 논문(external_id = "arXiv:<id>")과 매칭하기 위해 필요
+CITATION_FIELDS = (
+    "citations.paperId,citations.title,citations.authors,"
+    "references.paperId,references.title,references.authors,references.externalIds"
+)
+REFERENCE_FIELDS = "references.paperId,references.externalIds"
 
 
 class RelationAnalysisAgent:
     """관계 분석 Agent: Semantic Scholar 인용 관계 분석, 그래프 데이터 생성, 자연어 설명"""
     
     def __init__(self, db: Session):
-        self.semantic_scholar_base = "https://api.semanticscholar.org/graph/v1"
         self.db = db
     
 
     def get_citations(self, arxiv_id: str) -> Dict:
         """Semantic Scholar에서 인용/참고문헌 관계 가져오기"""
-        try:
-            url = f"{self.semantic_scholar_base}/paper/arXiv:{arxiv_id}"
-            params = {
-                "fields": (
-                    "citations.paperId,citations.title,citations.authors,"
-                    "references.paperId,references.title,references.authors"
-                )
-            }
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(
-                    f"인용 관계 조회 실패 (arXiv:{arxiv_id}, "
-                    f"status={response.status_code}, text={response.text[:200]!r})"
-                )
-                return {}
-        except Exception as e:
-            print(f"인용 관계 조회 오류 (arXiv:{arxiv_id}): {e}")
-            return {}
+        return semantic_scholar.fetch_paper(arxiv_id, CITATION_FIELDS, timeout=10) or {}
+    
+
+    def get_references_batch(self, arxiv_ids: List[str]) -> Optional[List[Dict]]:
+        """
+        POST /paper/batch로 여러 논문의 참고문헌(paperId)을 한 번에 조회
+        요청 순서대로 반환 (없는 논문은 빈 dict), 요청 자체가 실패하면 None
+        """
+        return semantic_scholar.fetch_papers_batch(arxiv_ids, REFERENCE_FIELDS)
     
 
     def find_common_citations(self, papers: List[Dict]) -> Dict:
@@ -48,28 +46,40 @@ class RelationAnalysisAgent:
                 {
                   "arxiv_id": "2301.00001",
                   "title": "...",
-                  "cited_ids": { "SS_paper_id_1", "SS_paper_id_2", ... }
+                  "cited_ids": frozenset({ "SS_paper_id_1", "SS_paper_id_2", ... })
                 },
                 ...
               ],
-              "common_citation_ids": ["SS_paper_id_1", "SS_paper_id_3", ...]
+              "common_citation_ids": ["SS_paper_id_1", "SS_paper_id_3", ...],
+              "ref_external_ids": { "SS_paper_id_1": "arXiv:2005.11401", ... }  # arXiv에 있는 참고문헌만
             }
         """
         if len(papers) < 2:
             return {}
         
+        arxiv_papers = [paper for paper in papers if paper.get("arxiv_id")]
+        if not arxiv_papers:
+            return {}
+        
+        # batch 엔드포인트로 한 번에 조회, 실패하면 논문별 조회를 동시에 실행
+        arxiv_ids = [p["arxiv_id"] for p in arxiv_papers]
+        results = self.get_references_batch(arxiv_ids)
+        if results is None:
+            workers = min(SEMANTIC_SCHOLAR_MAX_WORKERS, len(arxiv_papers))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.get_citations, arxiv_ids))
+        
         citation_sets = []
-        for paper in papers:
-            arxiv_id = paper.get("arxiv_id")
-            if not arxiv_id:
-                continue
-            
-            data = self.get_citations(arxiv_id)
-            cited_ids = {
-                ref.get("paperId")
-                for ref in data.get("references", [])
-                if ref.get("paperId")
-            }
+        ref_external_ids: Dict[str, str] = {}
+        for paper, data in zip(arxiv_papers, results):
+            arxiv_id = paper["arxiv_id"]
+            references = [ref for ref in data.get("references", []) if ref.get("paperId")]
+            cited_ids = frozenset(ref["paperId"] for ref in references)
+            # 참고문헌 paperId -> DB external_id (arXiv 논문만 DB에 저장되므로 arXiv ID가 있는 것만)
+            for ref in references:
+                ref_arxiv_id = (ref.get("externalIds") or {}).get("ArXiv")
+                if ref_arxiv_id:
+                    ref_external_ids[ref["paperId"]] = canonical_arxiv_id(ref_arxiv_id)
             
             citation_sets.append({
                 "arxiv_id": arxiv_id,
@@ -80,14 +90,13 @@ class RelationAnalysisAgent:
         if len(citation_sets) < 2:
             return {}
         
-        # 모든 논문이 공통으로 인용한 논문 ID 집합
-        common_citations = set(citation_sets[0]["cited_ids"])
-        for citation_set in citation_sets[1:]:
-            common_citations &= citation_set["cited_ids"]
+        # 모든 논문이 공통으로 인용한 논문 ID 집합 (C 구현 교집합으로 한 번에 계산)
+        common_citations = frozenset.intersection(*(cs["cited_ids"] for cs in citation_sets))
         
         return {
             "papers": citation_sets,
-            "common_citation_ids": list(common_citations)[:10]  # 최대 10개
+            "common_citation_ids": list(common_citations)[:10],  # 최대 10개
+            "ref_external_ids": ref_external_ids
         }
     
 
@@ -127,16 +136,16 @@ class RelationAnalysisAgent:
                 "type": "cited_paper"
             })
         
-        # 실제로 그 논문이 그 cited_id를 인용하는 경우에만 엣지 생성
+        # 공통 인용 논문은 모든 논문의 cited_ids에 포함되어 있으므로
+        # 각 논문의 전체 참고문헌을 훑지 않고 common_ids만으로 엣지 생성
         for cset in citation_sets:
             src_arxiv = cset["arxiv_id"]
-            for cited_id in cset["cited_ids"]:
-                if cited_id in common_ids:
-                    edges.append({
-                        "source": src_arxiv,
-                        "target": cited_id,
-                        "type": "cites"
-                    })
+            for cited_id in common_ids:
+                edges.append({
+                    "source": src_arxiv,
+                    "target": cited_id,
+                    "type": "cites"
+                })
         
         return {
             "nodes": nodes,
@@ -179,6 +188,31 @@ class RelationAnalysisAgent:
             return
         
         try:
+            # 참고문헌의 arXiv ID(external_id = "arXiv:<id>")로 DB 논문과 한 번에 매칭
+            # (인덱스를 타는 정확 일치 IN 조회, arXiv ID가 없는 참고문헌은 DB에 있을 수 없으므로 제외)
+            ref_external_ids: Dict[str, str] = citation_data.get("ref_external_ids", {})
+            ss_to_db: Dict[str, int] = {}
+            if ref_external_ids:
+                rows = (
+                    self.db.query(Paper.external_id, Paper.paper_id)
+                    .filter(Paper.external_id.in_(set(ref_external_ids.values())))
+                    .all()
+                )
+                external_to_db = dict(rows)
+                ss_to_db = {
+                    ref_paper_id: external_to_db[external_id]
+                    for ref_paper_id, external_id in ref_external_ids.items()
+                    if external_id in external_to_db
+                }
+            
+            # 이미 저장된 인용 관계를 한 번에 조회 (쌍마다 SELECT 하지 않고 set으로 중복 체크)
+            existing_edges = set(
+                self.db.query(CitationGraph.citing_paper_id, CitationGraph.cited_paper_id)
+                .filter(CitationGraph.citing_paper_id.in_(list(arxiv_to_db.values())))
+                .all()
+            )
+            new_citations: List[CitationGraph] = []
+            
             for paper_dict in citation_data.get("papers", []):
                 arxiv_id = paper_dict.get("arxiv_id")
                 if not arxiv_id:
@@ -194,34 +228,26 @@ class RelationAnalysisAgent:
                         continue
                     
                     # DB에서 해당 ref_paper_id와 매칭되는 논문 찾기
-                    cited_paper = (
-                        self.db.query(Paper)
-                        .filter(Paper.external_id.like(f"%{ref_paper_id}%"))
-                        .first()
-                    )
+                    cited_paper_id = ss_to_db.get(ref_paper_id)
                     
-                    if not cited_paper or cited_paper.paper_id == citing_paper_id:
+                    if not cited_paper_id or cited_paper_id == citing_paper_id:
                         continue
                     
                     # 중복 관계 체크
-                    existing = (
-                        self.db.query(CitationGraph)
-                        .filter(
-                            CitationGraph.citing_paper_id == citing_paper_id,
-                            CitationGraph.cited_paper_id == cited_paper.paper_id
-                        )
-                        .first()
-                    )
+                    edge = (citing_paper_id, cited_paper_id)
+                    if edge in existing_edges:
+                        continue
                     
-                    if not existing:
-                        citation = CitationGraph(
-                            citing_paper_id=citing_paper_id,
-                            cited_paper_id=cited_paper.paper_id,
-                            relation_type="reference",
-                            is_influential=0
-                        )
-                        self.db.add(citation)
+                    existing_edges.add(edge)
+                    new_citations.append(CitationGraph(
+                        citing_paper_id=citing_paper_id,
+                        cited_paper_id=cited_paper_id,
+                        relation_type="reference",
+                        is_influential=0
+                    ))
             
+            if new_citations:
+                self.db.bulk_save_objects(new_citations)
             self.db.commit()
         except Exception as e:
             self.db.rollback()
@@ -234,30 +260,41 @@ class RelationAnalysisAgent:
         arxiv_to_db: Dict[str, int] = {}
         paper_ids: List[int] = []
         
+        # 논문마다 SELECT 하지 않고 IN 쿼리 한 번으로 조회
+        ext_ids = [canonical_arxiv_id(p["arxiv_id"]) for p in papers if p.get("arxiv_id")]
+        db_map: Dict[str, int] = {}
+        if ext_ids:
+            rows = (
+                self.db.query(Paper.external_id, Paper.paper_id)
+                .filter(Paper.external_id.in_(ext_ids))
+                .all()
+            )
+            db_map = dict(rows)
+        
         for paper in papers:
             arxiv_id = paper.get("arxiv_id")
             if not arxiv_id:
                 continue
             
-            db_paper = self.db.query(Paper).filter(
-                Paper.external_id == f"arXiv:{arxiv_id}"
-            ).first()
-            
-            if db_paper:
-                arxiv_to_db[arxiv_id] = db_paper.paper_id
-                paper_ids.append(db_paper.paper_id)
-                paper["db_paper_id"] = db_paper.paper_id
+            db_paper_id = db_map.get(canonical_arxiv_id(arxiv_id))
+            if db_paper_id:
+                arxiv_to_db[arxiv_id] = db_paper_id
+                paper_ids.append(db_paper_id)
+                paper["db_paper_id"] = db_paper_id
         
         # 2) 공통 인용 분석 + 그래프 생성
         common_data = self.find_common_citations(papers)
         graph_data = self.build_graph_data(papers, common_data)
         
-        # 3) LLM 설명 생성
-        explanation = self.generate_explanation(graph_data, papers)
-        
-        # 4) 인용 관계 DB 저장
-        if arxiv_to_db and common_data:
-            self._save_citation_relations(arxiv_to_db, common_data)
+        # 3) LLM 설명 생성 + 4) 인용 관계 DB 저장
+        #    서로 공유하는 상태가 없으므로 LLM 호출은 별도 스레드에서, DB 저장은 세션을 가진 현재 스레드에서 동시에 실행
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            explanation_future = executor.submit(self.generate_explanation, graph_data, papers)
+            
+            if arxiv_to_db and common_data:
+                self._save_citation_relations(arxiv_to_db, common_data)
+            
+            explanation = explanation_future.result()
         
         return {
             "graph": graph_data,
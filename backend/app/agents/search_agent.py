@@ -1,19 +1,48 @@
-import arxiv
-import requests
+import calendar
+import feedparser
+import orjson
+import re
+import threading
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from app.utils.kanana import call_kanana # 키워드 확장용 LLM 호출
 from app.models import Paper, User
+from app.utils import semantic_scholar
+from app.utils.arxiv_ids import bare_arxiv_id, canonical_arxiv_id
+from app.utils.http import make_retry_session
+
+# Semantic Scholar 동시 요청 수 상한 (rate limit 고려)
+SEMANTIC_SCHOLAR_MAX_WORKERS = 8
+SEARCH_METADATA_FIELDS = "citationCount,citationVelocity,influentialCitationCount,year,venue"
+# LLM이 돌려준 키워드 목록 구분자 (쉼표/줄바꿈)
+_KW_SPLIT = re.compile(r"[,\n]+")
+# 관심 분야 -> 확장 키워드 캐시 (같은 관심 분야로 재요청/재시도할 때 LLM 호출 생략)
+_KEYWORD_CACHE: TTLCache = TTLCache(maxsize=512, ttl=86400)
+_keyword_cache_lock = threading.Lock()
+# arXiv 검색 API (search_arxiv는 ARXIV_PAGE_SIZE편 이하를 한 페이지 요청으로 받음)
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+ARXIV_PAGE_SIZE = 50
+ARXIV_TIMEOUT = 10
+_arxiv_session = make_retry_session(retries=2)
+_WHITESPACE_RE = re.compile(r"\s+")
 
 class SearchAgent:
     """논문 검색 Agent: 키워드 확장, arXiv 검색, Semantic Scholar 메타데이터 보강"""
     
     def __init__(self, db: Session):
-        self.semantic_scholar_base = "https://api.semanticscholar.org/graph/v1"
         self.db = db
     
     def expand_keywords(self, interest: str) -> List[str]:
-        """LLM으로 관심 분야 키워드 확장"""
+        """LLM으로 관심 분야 키워드 확장 (결과는 관심 분야별로 하루 동안 캐시)"""
+        cache_key = interest.strip()
+        with _keyword_cache_lock:
+            cached = _KEYWORD_CACHE.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         prompt = f"""다음 연구 관심 분야와 관련된 검색 키워드 5개를 영어로 제시해주세요.
 각 키워드는 논문 검색에 적합한 형태여야 합니다.
 관심 분야: {interest}
@@ -21,32 +50,60 @@ class SearchAgent:
 키워드만 쉼표로 구분하여 나열해주세요. 예: RAG, Retrieval Augmented Generation, retrieval-based QA"""
         
         response = call_kanana(prompt, temperature=0.3, max_tokens=256)
-        keywords = [k.strip() for k in response.replace("\n", "").split(",")]
-        return keywords[:5]  # 최대 5개
+        keywords = [k.strip() for k in _KW_SPLIT.split(response) if k.strip()][:5]  # 최대 5개
+        
+        # LLM 호출 실패(빈 응답)는 캐시하지 않음
+        if keywords:
+            with _keyword_cache_lock:
+                _KEYWORD_CACHE[cache_key] = tuple(keywords)
+        return keywords
     
     def search_arxiv(self, keywords: List[str], max_results: int = 20) -> List[Dict]:
-        """arXiv API로 논문 검색"""
+        """
+        arXiv API로 논문 검색
+        arxiv 라이브러리는 feedparser가 URL을 직접 열어 타임아웃/연결 재사용이 없으므로
+        공유 세션으로 Atom 피드를 받아 필요한 필드만 바로 dict로 만듦
+        """
         papers = []
         query = " OR ".join([f'all:"{kw}"' for kw in keywords[:3]])  # 상위 3개 키워드로 검색
         
         try:
-            # arXiv 클라이언트 생성 시 최신 API endpoint 사용
-            client = arxiv.Client()
-            search = arxiv.Search(
-                query=query,
-                max_results=min(max_results, 50),
-                sort_by=arxiv.SortCriterion.SubmittedDate
+            response = _arxiv_session.get(
+                ARXIV_API_URL,
+                params={
+                    "search_query": query,
+                    "start": 0,
+                    "max_results": min(max_results, ARXIV_PAGE_SIZE),
+                    "sortBy": "submittedDate",
+                    "sortOrder": "descending"
+                },
+                timeout=ARXIV_TIMEOUT
             )
+            response.raise_for_status()
+            feed = feedparser.parse(response.content)
             
-            for result in client.results(search):
+            for entry in feed.entries:
+                published = (
+                    datetime.fromtimestamp(calendar.timegm(entry.published_parsed), tz=timezone.utc)
+                    if entry.get("published_parsed") else None
+                )
+                authors = [author.name for author in entry.get("authors", [])]
+                pdf_url = next(
+                    (link.href for link in entry.get("links", []) if link.get("title") == "pdf"),
+                    None
+                )
                 papers.append({
-                    "arxiv_id": result.entry_id.split("/")[-1],
-                    "title": result.title,
-                    "authors": [author.name for author in result.authors],
-                    "abstract": result.summary,
-                    "published_date": result.published.strftime("%Y-%m-%d") if result.published else None,
-                    "pdf_url": result.pdf_url,
-                    "categories": result.categories
+                    "arxiv_id": bare_arxiv_id(entry.id),
+                    "title": _WHITESPACE_RE.sub(" ", entry.get("title", "")),
+                    "authors": authors,
+                    # DB 저장용 JSON은 검색 시 한 번만 만들어 두고 재사용
+                    "_authors_json": orjson.dumps(authors).decode(),
+                    "abstract": entry.get("summary", ""),
+                    "published_date": published.strftime("%Y-%m-%d") if published else None,
+                    # 선정 단계 최신성 점수용 (논문마다 날짜 문자열을 다시 파싱하지 않도록)
+                    "published_ts": published.timestamp() if published else None,
+                    "pdf_url": pdf_url,
+                    "categories": [tag.get("term") for tag in entry.get("tags", [])]
                 })
         except Exception as e:
             print(f"arXiv 검색 오류: {e}")
@@ -54,48 +111,62 @@ class SearchAgent:
         return papers
     
     def enrich_with_semantic_scholar(self, papers: List[Dict]) -> List[Dict]:
-        """Semantic Scholar API로 메타데이터 보강"""
-        enriched = []
-        
-        for paper in papers:
-            arxiv_id = paper.get("arxiv_id", "")
-            if not arxiv_id:
-                enriched.append(paper)
-                continue
-            
-            try:
-                # arXiv ID로 Semantic Scholar에서 검색
-                url = f"{self.semantic_scholar_base}/paper/arXiv:{arxiv_id}"
-                params = {
-                    "fields": "citationCount,citationVelocity,influentialCitationCount,year,venue"
-                }
-                response = requests.get(url, params=params, timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    paper["citation_count"] = data.get("citationCount", 0)
-                    paper["citation_velocity"] = data.get("citationVelocity", 0)
-                    paper["influential_citation_count"] = data.get("influentialCitationCount", 0)
-                    paper["year"] = data.get("year")
-                    paper["venue"] = data.get("venue", "")
-                else:
-                    # 기본값 설정
-                    paper["citation_count"] = 0
-                    paper["citation_velocity"] = 0
-                    paper["influential_citation_count"] = 0
-            except Exception as e:
-                print(f"Semantic Scholar 보강 오류 (arXiv:{arxiv_id}): {e}")
-                paper["citation_count"] = 0
-                paper["citation_velocity"] = 0
-                paper["influential_citation_count"] = 0
-            
-            enriched.append(paper)
+        """
+        Semantic Scholar API로 메타데이터 보강
+        - batch 엔드포인트로 모든 논문을 한 번에 조회
+        - batch 요청이 실패하면 논문별 요청을 동시에 실행
+        """
+        if not papers:
+            return []
         
-        return enriched
+        arxiv_papers = [paper for paper in papers if paper.get("arxiv_id")]
+        if arxiv_papers:
+            results = self._fetch_batch_metadata([p["arxiv_id"] for p in arxiv_papers])
+            if results is None:
+                workers = min(SEMANTIC_SCHOLAR_MAX_WORKERS, len(arxiv_papers))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(self._enrich_paper, arxiv_papers))
+            else:
+                for paper, data in zip(arxiv_papers, results):
+                    self._apply_metadata(paper, data)
+        
+        return papers
+    
+    def _fetch_batch_metadata(self, arxiv_ids: List[str]) -> Optional[List[Dict]]:
+        """
+        POST /paper/batch로 여러 논문 메타데이터를 한 번에 조회 (요청 순서대로, 없는 논문은 빈 dict)
+        요청 자체가 실패하면 None 반환
+        """
+        return semantic_scholar.fetch_papers_batch(arxiv_ids, SEARCH_METADATA_FIELDS)
+    
+    def _apply_metadata(self, paper: Dict, data: Optional[Dict]) -> Dict:
+        """Semantic Scholar 응답을 paper dict에 반영 (응답이 없으면 기본값)"""
+        if data:
+            paper["citation_count"] = data.get("citationCount", 0)
+            paper["citation_velocity"] = data.get("citationVelocity", 0)
+            paper["influential_citation_count"] = data.get("influentialCitationCount", 0)
+            paper["year"] = data.get("year")
+            paper["venue"] = data.get("venue", "")
+        else:
+            # 기본값 설정
+            paper["citation_count"] = 0
+            paper["citation_velocity"] = 0
+            paper["influential_citation_count"] = 0
+        return paper
+    
+    def _enrich_paper(self, paper: Dict) -> Dict:
+        """논문 1편의 Semantic Scholar 메타데이터 보강"""
+        arxiv_id = paper.get("arxiv_id", "")
+        if not arxiv_id:
+            return paper
+        
+        # arXiv ID로 Semantic Scholar에서 검색
+        data = semantic_scholar.fetch_paper(arxiv_id, SEARCH_METADATA_FIELDS, timeout=5)
+        return self._apply_metadata(paper, data)
     
     def _check_existing_paper(self, arxiv_id: str) -> Optional[Paper]:
         """DB에 이미 존재하는 논문인지 확인"""
-        return self.db.query(Paper).filter(Paper.external_id == f"arXiv:{arxiv_id}").first()
+        return self.db.query(Paper).filter(Paper.external_id == canonical_arxiv_id(arxiv_id)).first()
     
     def get_user_interest(self, user_id: int) -> str | None :
         """DB에서 사용자의 관심 분야 가져오기"""
@@ -126,28 +197,34 @@ class SearchAgent:
         papers = self.search_arxiv(keywords, max_results)
         print(f"arXiv 검색 결과: {len(papers)}편")
         
-        # 3. Semantic Scholar 메타데이터 보강
-        enriched_papers = self.enrich_with_semantic_scholar(papers)
+        # 3. Semantic Scholar 메타데이터 보강 (HTTP 대기는 별도 스레드에서)
+        #    서로 의존하지 않는 4번 DB 조회와 동시에 진행
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            enrich_future = executor.submit(self.enrich_with_semantic_scholar, papers)
+            
+            # 4. DB에 이미 존재하는 논문 조회 (중복 방지, 세션은 현재 스레드에서만 사용)
+            #    필요한 건 paper_id뿐이므로 Paper 객체 대신 두 컬럼만 조회
+            existing_map: Dict[str, int] = {}
+            if self.db:
+                external_ids = [canonical_arxiv_id(p["arxiv_id"]) for p in papers if p.get("arxiv_id")]
+                if external_ids:
+                    rows = (
+                        self.db.query(Paper.external_id, Paper.paper_id)
+                        .filter(Paper.external_id.in_(external_ids))
+                        .all()
+                    )
+                    existing_map = dict(rows)
+            
+            enriched_papers = enrich_future.result()
         
-        # 4. DB에 이미 존재하는 논문인지 확인 (중복 방지)
         if self.db:
-            arxiv_ids = [p["arxiv_id"] for p in enriched_papers if p.get("arxiv_id")]
-            external_ids = [f"arXiv:{aid}" for aid in arxiv_ids]
-            existing_papers = (
-                self.db.query(Paper)
-                .filter(Paper.external_id.in_(external_ids))
-                .all()
-            )
-            existing_map = {p.external_id: p for p in existing_papers}
-
             for paper in enriched_papers:
                 aid = paper.get("arxiv_id")
                 if not aid:
                     continue
-                ext_id = f"arXiv:{aid}"
-                existing = existing_map.get(ext_id)
-                paper["exists_in_db"] = existing is not None
-                if existing:
-                    paper["db_paper_id"] = existing.paper_id
+                db_paper_id = existing_map.get(canonical_arxiv_id(aid))
+                paper["exists_in_db"] = db_paper_id is not None
+                if db_paper_id is not None:
+                    paper["db_paper_id"] = db_paper_id
         
         return enriched_papers
\ No newline at end of file
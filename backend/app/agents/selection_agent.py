@@ -1,29 +1,83 @@
 import arxiv
+import bisect
 import pdfplumber
-import requests
+from pdfminer.high_level import extract_text as pdfminer_extract_text
 import os
+import shutil
 import json
-from typing import List, Dict, Optional
+import logging
+import orjson
+import threading
+import time
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Optional, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
-from app.utils.kanana import call_kanana
+from sqlalchemy.orm import Session, joinedload
+from app.utils.kanana import call_kanana, make_prompt_text
 from app.models import Paper, PaperMetadata
+from app.utils.arxiv_ids import canonical_arxiv_id
+from app.utils.http import make_retry_session
+
+logger = logging.getLogger(__name__)
+
+LEVEL_KR = {
+    "beginner": "초보자",
+    "intermediate": "중급자",
+    "advanced": "고급자"
+}
+
+# LLM 일괄 평가 시 한 프롬프트에 넣는 논문 수
+SCORE_BATCH_SIZE = 10
+# LLM 평가 대상 = 최신성/인용 점수 상위 top_n * SHORTLIST_FACTOR편
+SHORTLIST_FACTOR = 2
+# LLM 평가 동시 실행 수 (실제 동시 호출 수는 kanana.py의 KANANA_CONCURRENCY로 한 번 더 제한됨)
+LLM_SCORE_MAX_WORKERS = 4
+# 최신성 점수 구간: 게시 후 경과 일수 상한 -> 점수 (마지막 구간을 넘으면 RECENTNESS_OLDEST)
+RECENTNESS_DAYS = [30, 90, 180, 365]
+RECENTNESS_SCORES = [1.0, 0.8, 0.6, 0.4]
+RECENTNESS_OLDEST = 0.2
+
+# (arXiv ID, 관심 분야, 수준) -> LLM 평가 점수 캐시 (검색 결과가 겹치는 재요청에서 LLM 호출 생략)
+_LLM_SCORE_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=86400)
+_llm_score_cache_lock = threading.Lock()
+# PDF 임시 저장 경로
+PDF_TEMP_DIR = "/tmp/arxiv_papers"
+# PDF 다운로드 타임아웃 (초)
+PDF_DOWNLOAD_TIMEOUT = 30
+# PDF 다운로드용 세션 (동시 다운로드 스레드들이 arxiv.org 연결을 재사용)
+_pdf_session = make_retry_session()
 
 class SelectionAgent:
     """논문 선정 Agent: 가중치 기반 평가, 최적 3편 선정, PDF 다운로드 및 텍스트 추출"""
     
     def __init__(self, db: Optional[Session] = None):
-        self.temp_dir = "/tmp/arxiv_papers"
-        os.makedirs(self.temp_dir, exist_ok=True)
+        self.temp_dir = PDF_TEMP_DIR
+        # 점수/PDF 관련 캐시와 HTTP 세션은 모두 모듈 단위로 공유하므로
+        # 에이전트는 요청(DB 세션)마다 가볍게 만들어 써도 됨
         self.db = db
     
-    def calculate_score(self, paper: Dict, interest: str, level: str) -> float:
-        """가중치 기반 종합 점수 계산"""
+    def calculate_score(
+        self,
+        paper: Dict,
+        interest: str,
+        level: str,
+        llm_scores: Optional[Tuple[float, float]] = None,
+        now: Optional[float] = None
+    ) -> float:
+        """
+        가중치 기반 종합 점수 계산
+        llm_scores: _score_llm_batch로 미리 계산한 (키워드 일치도, 난이도 적합성). 없으면 _score_combined로 LLM 호출
+        now: 최신성 기준 시각 (epoch 초, 여러 논문을 평가할 때 한 번만 구해서 전달)
+        """
+        if llm_scores is None:
+            llm_scores = self._score_combined(paper, interest, level)
+        
         scores = {
-            "recentness": self._score_recentness(paper),
+            "recentness": self._score_recentness(paper, now),
             "citation": self._score_citation(paper),
-            "keyword_match": self._score_keyword_match(paper, interest),
-            "difficulty": self._score_difficulty(paper, level)
+            "keyword_match": llm_scores[0],
+            "difficulty": llm_scores[1]
         }
         
         # 가중치
@@ -37,25 +91,112 @@ class SelectionAgent:
         total_score = sum(scores[k] * weights[k] for k in scores)
         return total_score
     
-    def _score_recentness(self, paper: Dict) -> float:
-        """최신성 점수 (0-1)"""
-        if not paper.get("published_date"):
-            return 0.5
+    def _cheap_scores(self, papers: List[Dict], now: float) -> List[float]:
+        """
+        LLM 호출 없이 계산되는 부분 점수 (calculate_score와 같은 가중치)
+        후보 전체를 한 번에 계산해 paper["heuristic_score"]에 저장 (정렬 중 재계산 방지)
+        """
+        score_recentness = self._score_recentness
+        score_citation = self._score_citation
+        scores = [0.2 * score_recentness(paper, now) + 0.3 * score_citation(paper) for paper in papers]
+        for paper, score in zip(papers, scores):
+            paper["heuristic_score"] = score
+        return scores
+    
+    def _score_llm_batch(self, papers: List[Dict], interest: str, level: str) -> List[Optional[Tuple[float, float]]]:
+        """
+        키워드 일치도 + 난이도 적합성을 여러 논문에 대해 한 번의 LLM 호출로 평가
+        (논문마다 호출하던 것을 SCORE_BATCH_SIZE편당 1번으로)
+        응답을 해석하지 못한 묶음의 논문은 논문별 평가로 대체 (역시 동시에 호출)
+        이전에 같은 (논문, 관심 분야, 수준)으로 평가한 점수가 캐시에 있으면 재사용
+        """
+        cache_keys = [
+            (paper["arxiv_id"], interest, level) if paper.get("arxiv_id") else None
+            for paper in papers
+        ]
+        with _llm_score_cache_lock:
+            cached = [_LLM_SCORE_CACHE.get(key) if key else None for key in cache_keys]
+        
+        pending = [i for i, scores in enumerate(cached) if scores is None]
+        pending_papers = [papers[i] for i in pending]
+        batches = [pending_papers[start:start + SCORE_BATCH_SIZE] for start in range(0, len(pending_papers), SCORE_BATCH_SIZE)]
+        if not batches:
+            return cached
         
+        with ThreadPoolExecutor(max_workers=LLM_SCORE_MAX_WORKERS) as executor:
+            # 묶음끼리는 서로 독립적이므로 동시에 호출 (map이 묶음 순서를 유지)
+            batch_results = executor.map(lambda batch: self._score_one_batch(batch, interest, level), batches)
+            results = [scores for batch_scores in batch_results for scores in batch_scores]
+            
+            # 일괄 평가로 얻은 점수만 캐시 (논문별 평가는 해석 실패 시 기본값이 섞이므로 제외)
+            with _llm_score_cache_lock:
+                for i, scores in zip(pending, results):
+                    if scores is not None and cache_keys[i]:
+                        _LLM_SCORE_CACHE[cache_keys[i]] = scores
+            
+            failed = [j for j, scores in enumerate(results) if scores is None]
+            if failed:
+                single_results = executor.map(lambda j: self._score_combined(pending_papers[j], interest, level), failed)
+                for j, scores in zip(failed, single_results):
+                    results[j] = scores
+        
+        for i, scores in zip(pending, results):
+            cached[i] = scores
+        return cached
+    
+    def _score_one_batch(self, batch: List[Dict], interest: str, level: str) -> List[Optional[Tuple[float, float]]]:
+        """논문 한 묶음(SCORE_BATCH_SIZE편 이하)을 LLM 한 번으로 평가"""
+        level_kr = LEVEL_KR.get(level, "중급자")
+        paper_list = "\n\n".join(
+            f"[{i}] 제목: {p.get('title', '')}\n초록: {p.get('abstract', '')[:500]}"
+            for i, p in enumerate(batch, 1)
+        )
+        prompt = f"""다음 {len(batch)}편의 논문 각각에 대해 두 가지 점수를 0-1 사이로 평가해주세요.
+- 관련성: 관심 분야 "{interest}"와 얼마나 관련이 있는지
+- 적합성: {level_kr} 수준의 사용자가 이해하기 적합한지
+
+{paper_list}
+
+논문 순서대로 [관련성, 적합성] 쌍의 JSON 배열만 답해주세요. (예: [[0.85, 0.7], [0.3, 0.9]])"""
+        
+        response = call_kanana(prompt, temperature=0, max_tokens=16 * len(batch) + 16)
+        return self._parse_llm_scores(response, len(batch))
+    
+    def _parse_llm_scores(self, response: str, count: int) -> List[Optional[Tuple[float, float]]]:
+        """[[관련성, 적합성], ...] 응답 해석 (개수가 맞지 않거나 형식이 틀리면 전부 None)"""
         try:
-            pub_date = datetime.strptime(paper["published_date"], "%Y-%m-%d")
-            days_ago = (datetime.now() - pub_date).days
+            pairs = json.loads(response[response.index("["):response.rindex("]") + 1])
+            if len(pairs) != count:
+                raise ValueError(f"점수 개수 불일치 ({len(pairs)}/{count})")
+            return [
+                (max(0.0, min(1.0, float(rel))), max(0.0, min(1.0, float(diff))))
+                for rel, diff in pairs
+            ]
+        except Exception as e:
+            print(f"LLM 일괄 평가 응답 해석 실패, 논문별 평가로 대체: {e}")
+            return [None] * count
+    
+    def _score_recentness(self, paper: Dict, now: Optional[float] = None) -> float:
+        """
+        최신성 점수 (0-1)
+        검색 시 저장해 둔 published_ts(epoch 초)를 사용하고, 없을 때만 published_date("YYYY-MM-DD") 문자열을 변환
+        """
+        if now is None:
+            now = time.time()
+        
+        try:
+            published_ts = paper.get("published_ts")
+            if published_ts is None:
+                if not paper.get("published_date"):
+                    return 0.5
+                # "YYYY-MM-DD"는 strptime(범용 포맷 파서) 대신 직접 나눠서 변환
+                year, month, day = paper["published_date"][:10].split("-")
+                published_ts = datetime(int(year), int(month), int(day)).timestamp()
+            days_ago = (now - published_ts) // 86400
             
-            if days_ago <= 30:
-                return 1.0
-            elif days_ago <= 90:
-                return 0.8
-            elif days_ago <= 180:
-                return 0.6
-            elif days_ago <= 365:
-                return 0.4
-            else:
-                return 0.2
+            # 구간 상한 목록에서 이진 탐색 (if/elif 사슬 대신)
+            step = bisect.bisect_left(RECENTNESS_DAYS, days_ago)
+            return RECENTNESS_SCORES[step] if step < len(RECENTNESS_SCORES) else RECENTNESS_OLDEST
         except:
             return 0.5
     
@@ -70,77 +211,108 @@ class SelectionAgent:
         
         return (citation_score * 0.7 + velocity_score * 0.3)
     
-    def _score_keyword_match(self, paper: Dict, interest: str) -> float:
-        """키워드 일치도 점수 (LLM 평가)"""
+    def _score_combined(self, paper: Dict, interest: str, level: str) -> Tuple[float, float]:
+        """
+        논문 1편의 (키워드 일치도, 난이도 적합성)을 LLM 한 번으로 평가
+        (초록을 한 번만 보내도록 두 점수를 JSON 하나로 받음, 해석 실패 시 각각 0.5)
+        """
         title = paper.get("title", "")
         abstract = paper.get("abstract", "")[:500]  # 처음 500자만
+        level_kr = LEVEL_KR.get(level, "중급자")
         
-        prompt = f"""다음 논문이 주어진 관심 분야와 얼마나 관련이 있는지 0-1 사이의 점수로 평가해주세요.
-관심 분야: {interest}
+        prompt = f"""다음 논문에 대해 두 가지 점수를 0-1 사이로 평가해주세요.
+- rel: 관심 분야 "{interest}"와 얼마나 관련이 있는지
+- diff: {level_kr} 수준의 사용자가 이해하기 적합한지
 
 논문 제목: {title}
 초록: {abstract}
 
-관련성 점수만 숫자로 답해주세요 (예: 0.85)"""
-        
-        try:
-            response = call_kanana(prompt, temperature=0, max_tokens=10)
-            score = float(response.strip())
-            return max(0.0, min(1.0, score))
-        except:
-            return 0.5
-    
-    def _score_difficulty(self, paper: Dict, level: str) -> float:
-        """난이도 적합성 점수 (LLM 평가)"""
-        abstract = paper.get("abstract", "")[:500]
-        
-        level_map = {
-            "beginner": "초보자",
-            "intermediate": "중급자",
-            "advanced": "고급자"
-        }
-        level_kr = level_map.get(level, "중급자")
-        
-        prompt = f"""다음 논문 초록을 보고 {level_kr} 수준의 사용자가 이해하기 적합한지 0-1 사이의 점수로 평가해주세요.
-
-초록: {abstract}
-
-적합성 점수만 숫자로 답해주세요 (예: 0.75)"""
+JSON으로만 답해주세요. (예: {{"rel": 0.85, "diff": 0.7}})"""
         
         try:
-            response = call_kanana(prompt, temperature=0, max_tokens=10)
-            score = float(response.strip())
-            return max(0.0, min(1.0, score))
+            response = call_kanana(prompt, temperature=0, max_tokens=32)
+            scores = json.loads(response[response.index("{"):response.rindex("}") + 1])
+            return (
+                max(0.0, min(1.0, float(scores["rel"]))),
+                max(0.0, min(1.0, float(scores["diff"])))
+            )
         except:
-            return 0.5
+            return (0.5, 0.5)
     
-    def download_pdf(self, arxiv_id: str) -> str:
-        """arXiv에서 PDF 다운로드"""
+    def download_pdf(self, arxiv_id: str, pdf_url: Optional[str] = None) -> str:
+        """
+        arXiv에서 PDF 다운로드
+        - pdf_url이 있으면 (검색 결과에 이미 포함됨) arXiv API 조회 없이 바로 스트리밍 다운로드
+        """
+        filename = f"{arxiv_id.replace('/', '_')}.pdf"
+        path = os.path.join(self.temp_dir, filename)
         try:
+            # 실행 중에 tmp 정리로 디렉터리가 지워질 수 있으므로 다운로드할 때마다 확인
+            os.makedirs(self.temp_dir, exist_ok=True)
+            if pdf_url:
+                with _pdf_session.get(pdf_url, stream=True, timeout=PDF_DOWNLOAD_TIMEOUT) as r:
+                    r.raise_for_status()
+                    r.raw.decode_content = True
+                    with open(path, "wb") as f:
+                        shutil.copyfileobj(r.raw, f)
+                return path
+            
             paper = next(arxiv.Search(id_list=[arxiv_id]).results())
-            paper.download_pdf(dirpath=self.temp_dir, filename=f"{arxiv_id}.pdf")
-            return os.path.join(self.temp_dir, f"{arxiv_id}.pdf")
+            paper.download_pdf(dirpath=self.temp_dir, filename=filename)
+            return path
         except Exception as e:
             print(f"PDF 다운로드 오류 (arXiv:{arxiv_id}): {e}")
             return None
     
+    def _fetch_full_text(self, paper: Dict) -> Dict:
+        """PDF 다운로드 + 텍스트 추출 후 paper["full_text"]에 저장 (DB 접근 없음, 스레드에서 호출)"""
+        arxiv_id = paper.get("arxiv_id")
+        if arxiv_id:
+            pdf_path = self.download_pdf(arxiv_id, paper.get("pdf_url"))
+            if pdf_path:
+                full_text = self.extract_text(pdf_path)
+                paper["full_text"] = full_text
+                # 임시 파일 삭제
+                try:
+                    os.remove(pdf_path)
+                except:
+                    pass
+        return paper
+    
     def extract_text(self, pdf_path: str) -> str:
-        """PDF에서 텍스트 추출"""
+        """
+        PDF에서 텍스트 추출
+        - pdfminer로 텍스트만 빠르게 추출 (pdfplumber처럼 페이지마다 문자/선/사각형 객체를 만들지 않음)
+        - 결과가 비어 있으면 pdfplumber로 다시 시도
+        """
         if not pdf_path or not os.path.exists(pdf_path):
             return ""
         
         try:
-            text = ""
+            text = pdfminer_extract_text(pdf_path)
+            if text and text.strip():
+                return text
+        except Exception as e:
+            print(f"텍스트 추출 오류 (pdfminer): {e}")
+        
+        try:
             with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
-            return text
+                return "".join(page.extract_text() or "" for page in pdf.pages)
         except Exception as e:
             print(f"텍스트 추출 오류: {e}")
             return ""
     
-    def _save_paper_to_db(self, paper_data: Dict) -> Optional[int]:
-        """논문을 DB에 저장하고 paper_id 반환"""
+    def _save_paper_to_db(
+        self,
+        paper_data: Dict,
+        existing_papers: Optional[Dict[str, Paper]] = None,
+        commit: bool = True
+    ) -> Optional[int]:
+        """
+        논문을 DB에 저장하고 paper_id 반환
+        - existing_papers: 미리 조회해 둔 external_id -> Paper(메타데이터 포함). 없으면 여기서 조회
+        - commit=False: savepoint 안에서 flush만 하고, commit은 호출한 쪽에서 한 번에 수행
+        """
         if not self.db:
             return None
         
@@ -148,100 +320,144 @@ class SelectionAgent:
         if not arxiv_id:
             return None
         
-        # 이미 존재하는 논문인지 확인
-        existing = self.db.query(Paper).filter(
-            Paper.external_id == f"arXiv:{arxiv_id}"
-        ).first()
-        
-        if existing:
-            paper_id = existing.paper_id
-            # 기존 논문 업데이트
-            existing.title = paper_data.get("title", existing.title)
-            existing.authors = json.dumps(paper_data.get("authors", []))
-            existing.published_date = paper_data.get("published_date")
-            existing.source = "arXiv"
-            existing.pdf_url = paper_data.get("pdf_url")
-            existing.abstract = paper_data.get("abstract")
-        else:
-            # 새 논문 생성
-            new_paper = Paper(
-                title=paper_data.get("title", ""),
-                authors=json.dumps(paper_data.get("authors", [])),
-                published_date=paper_data.get("published_date"),
-                source="arXiv",
-                external_id=f"arXiv:{arxiv_id}",
-                pdf_url=paper_data.get("pdf_url"),
-                abstract=paper_data.get("abstract", "")
-            )
-            self.db.add(new_paper)
-            self.db.flush()
-            paper_id = new_paper.paper_id
-        
-        # PaperMetadata 저장/업데이트
-        metadata = self.db.query(PaperMetadata).filter(
-            PaperMetadata.paper_id == paper_id
-        ).first()
-        
-        if not metadata:
-            metadata = PaperMetadata(paper_id=paper_id)
-            self.db.add(metadata)
-        
-        # PDF 텍스트 저장
-        if paper_data.get("full_text"):
-            metadata.full_text = paper_data["full_text"]
+        external_id = canonical_arxiv_id(arxiv_id)
+        authors_json = paper_data.get("_authors_json") or orjson.dumps(paper_data.get("authors", [])).decode()
         
-        # Semantic Scholar 메트릭 저장
-        metadata.citation_count = paper_data.get("citation_count", 0)
-        metadata.citation_velocity = paper_data.get("citation_velocity", 0)
-        metadata.influential_citation_count = paper_data.get("influential_citation_count", 0)
-        
-        # 키워드 저장 (categories를 JSON으로)
-        if paper_data.get("categories"):
-            metadata.keywords = json.dumps(paper_data["categories"])
+        # 이미 존재하는 논문인지 확인 (메타데이터까지 함께 조회)
+        if existing_papers is None:
+            existing = (
+                self.db.query(Paper)
+                .options(joinedload(Paper.paper_metadata))
+                .filter(Paper.external_id == external_id)
+                .first()
+            )
+        else:
+            existing = existing_papers.get(external_id)
         
+        savepoint = None if commit else self.db.begin_nested()
         try:
-            self.db.commit()
-            return paper_id
+            if existing:
+                paper = existing
+                # 기존 논문 업데이트
+                paper.title = paper_data.get("title", paper.title)
+                paper.authors = authors_json
+                paper.published_date = paper_data.get("published_date")
+                paper.source = "arXiv"
+                paper.pdf_url = paper_data.get("pdf_url")
+                paper.abstract = paper_data.get("abstract")
+            else:
+                # 새 논문 생성
+                paper = Paper(
+                    title=paper_data.get("title", ""),
+                    authors=authors_json,
+                    published_date=paper_data.get("published_date"),
+                    source="arXiv",
+                    external_id=external_id,
+                    pdf_url=paper_data.get("pdf_url"),
+                    abstract=paper_data.get("abstract", "")
+                )
+                self.db.add(paper)
+            
+            # PaperMetadata 저장/업데이트 (논문과 같은 flush에서 INSERT)
+            metadata = paper.paper_metadata
+            if not metadata:
+                metadata = PaperMetadata()
+                paper.paper_metadata = metadata
+            
+            # PDF 텍스트 저장
+            if paper_data.get("full_text"):
+                metadata.full_text = paper_data["full_text"]
+                metadata.prompt_text = make_prompt_text(paper_data["full_text"])
+            
+            # Semantic Scholar 메트릭 저장
+            metadata.citation_count = paper_data.get("citation_count", 0)
+            metadata.citation_velocity = paper_data.get("citation_velocity", 0)
+            metadata.influential_citation_count = paper_data.get("influential_citation_count", 0)
+            
+            # 키워드 저장 (categories를 JSON으로)
+            if paper_data.get("categories"):
+                metadata.keywords = orjson.dumps(paper_data["categories"]).decode()
+            
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
+                savepoint.commit()
+            return paper.paper_id
         except Exception as e:
-            self.db.rollback()
-            print(f"DB 저장 오류: {e}")
+            if savepoint is not None:
+                savepoint.rollback()
+            else:
+                self.db.rollback()
+            logger.exception("DB 저장 오류: arxiv_id=%s", arxiv_id)
             return None
     
     def select_papers(self, candidate_papers: List[Dict], interest: str, level: str, top_n: int = 3) -> List[Dict]:
         """최적 논문 3편 선정 및 PDF 처리, DB 저장"""
-        # 점수 계산 및 정렬
-        scored_papers = []
-        for paper in candidate_papers:
-            # DB에 이미 존재하는 논문은 건너뛰기 (중복 체크)
-            if self.db and paper.get("exists_in_db"):
-                continue
-            score = self.calculate_score(paper, interest, level)
-            paper["selection_score"] = score
-            scored_papers.append(paper)
+        papers = list(self.iter_selected_papers(candidate_papers, interest, level, top_n))
+        # PDF 처리가 끝난 순서로 나오므로 점수 순으로 다시 정렬
+        papers.sort(key=lambda x: x["selection_score"], reverse=True)
+        return papers
+    
+    def iter_selected_papers(self, candidate_papers: List[Dict], interest: str, level: str, top_n: int = 3) -> Iterator[Dict]:
+        """
+        select_papers와 같지만, 논문 한 편의 PDF 처리/DB 저장이 끝날 때마다 바로 yield (점수 순이 아니라 처리가 끝난 순서)
+        (파이프라인에서 다음 논문 다운로드 중에 앞 논문의 요약을 먼저 시작할 수 있도록)
+        """
+        # DB에 이미 존재하는 논문은 건너뛰기 (중복 체크)
+        scored_papers = [
+            paper for paper in candidate_papers
+            if not (self.db and paper.get("exists_in_db"))
+        ]
+        
+        # LLM 없이 계산되는 점수(최신성 + 인용)로 먼저 걸러 상위 top_n * SHORTLIST_FACTOR편만 LLM 평가
+        # (LLM 점수 비중이 0.5라 이 점수에서 크게 밀리는 논문이 최종 top_n에 드는 경우는 드묾)
+        now = time.time()
+        shortlist_size = top_n * SHORTLIST_FACTOR
+        if len(scored_papers) > shortlist_size:
+            self._cheap_scores(scored_papers, now)
+            scored_papers = sorted(scored_papers, key=lambda p: p["heuristic_score"], reverse=True)[:shortlist_size]
+        
+        # 점수 계산 및 정렬 (LLM 평가는 여러 논문을 묶어서 한 번에)
+        llm_scores = self._score_llm_batch(scored_papers, interest, level)
+        for paper, paper_llm_scores in zip(scored_papers, llm_scores):
+            paper["selection_score"] = self.calculate_score(paper, interest, level, paper_llm_scores, now)
         
         # 상위 N개 선정
         selected = sorted(scored_papers, key=lambda x: x["selection_score"], reverse=True)[:top_n]
         
-        # PDF 다운로드 및 텍스트 추출, DB 저장
-        saved_paper_ids = []
-        for paper in selected:
-            arxiv_id = paper.get("arxiv_id")
-            if arxiv_id:
-                pdf_path = self.download_pdf(arxiv_id)
-                if pdf_path:
-                    full_text = self.extract_text(pdf_path)
-                    paper["full_text"] = full_text
-                    # 임시 파일 삭제
-                    try:
-                        os.remove(pdf_path)
-                    except:
-                        pass
-            
-            # DB에 저장
-            paper_id = self._save_paper_to_db(paper)
-            if paper_id:
-                paper["db_paper_id"] = paper_id
-                saved_paper_ids.append(paper_id)
+        # 선정된 논문 중 이미 DB에 있는 논문을 한 번에 조회 (논문마다 SELECT 하지 않도록)
+        existing_papers: Dict[str, Paper] = {}
+        if self.db:
+            external_ids = [canonical_arxiv_id(p['arxiv_id']) for p in selected if p.get("arxiv_id")]
+            if external_ids:
+                rows = (
+                    self.db.query(Paper)
+                    .options(joinedload(Paper.paper_metadata))
+                    .filter(Paper.external_id.in_(external_ids))
+                    .all()
+                )
+                existing_papers = {row.external_id: row for row in rows}
         
-        return selected
-
+        # PDF 다운로드 및 텍스트 추출은 논문별로 동시에 실행하고, 끝나는 순서대로 DB 저장
+        # (DB 저장은 이 스레드에서만 수행. yield하는 db_paper_id는 항상 commit된 논문을 가리키도록
+        #  논문마다 commit한 뒤 넘기고, commit 실패는 삼키지 않고 호출한 쪽으로 전파)
+        if not selected:
+            return
+        with ThreadPoolExecutor(max_workers=len(selected)) as executor:
+            futures = [executor.submit(self._fetch_full_text, paper) for paper in selected]
+            for future in as_completed(futures):
+                paper = future.result()
+                
+                # DB에 저장
+                paper_id = self._save_paper_to_db(paper, existing_papers=existing_papers, commit=False)
+                if paper_id:
+                    try:
+                        self.db.commit()
+                    except Exception:
+                        self.db.rollback()
+                        logger.exception("DB commit 실패: arxiv_id=%s", paper.get("arxiv_id"))
+                        raise
+                    paper["db_paper_id"] = paper_id
+                
+                yield paper
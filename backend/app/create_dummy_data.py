@@ -3,9 +3,14 @@
 """
 from .database import SessionLocal
 from .models import User, Paper, Recommendation, PaperMetadata, CitationGraph
+from .utils.arxiv_ids import canonical_arxiv_id
+from sqlalchemy import insert, tuple_
 from datetime import datetime, date, timedelta
-import json
-import bcrypt
+import orjson
+
+# 테스트 사용자(testuser / testpass123)의 bcrypt 해시
+# 시드 실행마다 해싱(cost 12)하지 않도록 미리 계산해 둔 값 (auth_router의 bcrypt.checkpw로 검증 가능)
+TESTUSER_HASH = "$2b$12$FT0XlT2iu43oDd.jW/S00.gQnB4jDRWzDfVcZzdL398o6DiX2e.Ny"
 
 def create_dummy_data():
     db = SessionLocal()
@@ -14,15 +19,16 @@ def create_dummy_data():
         # 1. 테스트용 사용자 생성 (없는 경우에만)
         test_user = db.query(User).filter(User.username == "testuser").first()
         if not test_user:
-            hashed_password = bcrypt.hashpw("testpass123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            test_user = User(
-                username="testuser",
-                password=hashed_password,
-                interest="RAG",
-                level="intermediate"
-            )
-            db.add(test_user)
-            db.flush()
+            # INSERT ... RETURNING으로 user_id를 바로 받음 (flush 없이 같은 트랜잭션 안에서 사용)
+            test_user = db.scalars(
+                insert(User).returning(User),
+                [{
+                    "username": "testuser",
+                    "password": TESTUSER_HASH,
+                    "interest": "RAG",
+                    "level": "intermediate"
+                }]
+            ).one()
             print(f"✅ 사용자 생성: user_id={test_user.user_id}, username={test_user.username}")
         else:
             print(f"✅ 기존 사용자 사용: user_id={test_user.user_id}, username={test_user.username}")
@@ -79,37 +85,37 @@ def create_dummy_data():
         created_papers = []
         today = date.today()
         
-        for paper_data in papers_data:
-            # 논문이 이미 있는지 확인 (title로)
-            existing_paper = db.query(Paper).filter(Paper.title == paper_data["title"]).first()
-            if existing_paper:
-                created_papers.append(existing_paper)
-                print(f"✅ 기존 논문 사용: paper_id={existing_paper.paper_id}, title={existing_paper.title[:50]}...")
-                continue
-            
-            # authors를 JSON 문자열로 변환
-            authors_json = json.dumps(paper_data["authors"])
-            
-            # external_id에 arXiv: 접두사 추가
-            external_id = paper_data.get("external_id", "")
-            if external_id and not external_id.startswith("arXiv:"):
-                external_id = f"arXiv:{external_id}"
-            
-            paper = Paper(
-                title=paper_data["title"],
-                authors=authors_json,
-                published_date=paper_data["published_date"],
-                source=paper_data["source"],
-                external_id=external_id,
-                pdf_url=paper_data["pdf_url"],
-                abstract=paper_data["abstract"]
-            )
-            db.add(paper)
-            db.flush()
-            created_papers.append(paper)
-            print(f"✅ 논문 생성: paper_id={paper.paper_id}, title={paper.title[:50]}...")
+        # 논문이 이미 있는지 한 번에 확인 (title로)
+        titles = [paper_data["title"] for paper_data in papers_data]
+        papers_by_title = {
+            paper.title: paper
+            for paper in db.query(Paper).filter(Paper.title.in_(titles)).all()
+        }
+        for paper in papers_by_title.values():
+            print(f"✅ 기존 논문 사용: paper_id={paper.paper_id}, title={paper.title[:50]}...")
         
-        db.commit()
+        # 없는 논문만 INSERT 한 번으로 추가 (RETURNING으로 생성된 Paper를 바로 받음)
+        # external_id는 정규 형태("arXiv:<id>")로 통일
+        paper_rows = [
+            {
+                "title": paper_data["title"],
+                "authors": orjson.dumps(paper_data["authors"]).decode(),
+                "published_date": paper_data["published_date"],
+                "source": paper_data["source"],
+                "external_id": canonical_arxiv_id(paper_data["external_id"]) if paper_data.get("external_id") else None,
+                "pdf_url": paper_data["pdf_url"],
+                "abstract": paper_data["abstract"]
+            }
+            for paper_data in papers_data
+            if paper_data["title"] not in papers_by_title
+        ]
+        if paper_rows:
+            new_papers = db.scalars(insert(Paper).returning(Paper), paper_rows).all()
+            for paper in new_papers:
+                papers_by_title[paper.title] = paper
+                print(f"✅ 논문 생성: paper_id={paper.paper_id}, title={paper.title[:50]}...")
+        
+        created_papers = [papers_by_title[title] for title in titles]
         
         # 3. 오늘 날짜의 추천 논문 생성 (3개 - relations API 테스트용)
         today_start = datetime.combine(today, datetime.min.time())
@@ -127,108 +133,94 @@ def create_dummy_data():
             recommended_papers = [rec.paper for rec in existing_today_recs if rec.paper]
         else:
             # 오늘 추천 논문 3개 생성 (relations API 테스트용)
+            recommendation_rows = []
             for i, paper in enumerate(created_papers[:3]):
                 rec_time = today_start + timedelta(hours=i*2)  # 시간 간격을 두고
-                recommendation = Recommendation(
-                    user_id=test_user.user_id,
-                    paper_id=paper.paper_id,
-                    recommended_at=rec_time,
-                    is_user_requested=False
-                )
-                db.add(recommendation)
+                recommendation_rows.append({
+                    "user_id": test_user.user_id,
+                    "paper_id": paper.paper_id,
+                    "recommended_at": rec_time,
+                    "is_user_requested": False
+                })
                 recommended_papers.append(paper)
                 print(f"✅ 오늘 추천 논문 생성: paper_id={paper.paper_id}, recommended_at={rec_time}")
             
-            db.commit()
+            if recommendation_rows:
+                db.bulk_insert_mappings(Recommendation, recommendation_rows)
         
-        # 4. 공통 인용 논문 생성 (Attention Is All You Need - relations API 테스트용)
-        common_ref_paper = None
-        if len(created_papers) >= 4:
-            common_ref_paper = created_papers[3]  # Attention Is All You Need
-        else:
-            # 없으면 새로 생성
-            common_ref_data = {
-                "title": "Attention Is All You Need",
-                "authors": ["Ashish Vaswani", "Noam Shazeer", "Niki Parmar", "Jakob Uszkoreit", "Llion Jones"],
-                "published_date": "2017-06-12",
-                "source": "arXiv",
-                "external_id": "arXiv:1706.03762",
-                "pdf_url": "https://arxiv.org/pdf/1706.03762.pdf",
-                "abstract": "The dominant sequence transduction models are based on complex recurrent or convolutional neural networks."
-            }
-            
-            existing_common = db.query(Paper).filter(
-                Paper.external_id == "arXiv:1706.03762"
+        # 4. 공통 인용 논문 (Attention Is All You Need - relations API 테스트용)
+        common_ref_paper = papers_by_title.get("Attention Is All You Need")
+        if common_ref_paper is None:
+            common_ref_paper = db.query(Paper).filter(
+                Paper.external_id == canonical_arxiv_id("1706.03762")
             ).first()
-            
-            if existing_common:
-                common_ref_paper = existing_common
-                print(f"✅ 기존 공통 인용 논문 사용: paper_id={common_ref_paper.paper_id}")
-            else:
-                authors_json = json.dumps(common_ref_data["authors"])
-                common_ref_paper = Paper(
-                    title=common_ref_data["title"],
-                    authors=authors_json,
-                    published_date=common_ref_data["published_date"],
-                    source=common_ref_data["source"],
-                    external_id=common_ref_data["external_id"],
-                    pdf_url=common_ref_data["pdf_url"],
-                    abstract=common_ref_data["abstract"]
-                )
-                db.add(common_ref_paper)
-                db.flush()
-                print(f"✅ 공통 인용 논문 생성: paper_id={common_ref_paper.paper_id}")
-                db.commit()
+        if common_ref_paper:
+            print(f"✅ 공통 인용 논문: paper_id={common_ref_paper.paper_id}")
         
         # 5. 인용 관계 생성 (3개 추천 논문이 모두 공통 인용 논문을 인용)
         if common_ref_paper and len(recommended_papers) >= 3:
-            for rec_paper in recommended_papers[:3]:
-                # 기존 인용 관계 확인
-                existing_citation = db.query(CitationGraph).filter(
-                    CitationGraph.citing_paper_id == rec_paper.paper_id,
-                    CitationGraph.cited_paper_id == common_ref_paper.paper_id
-                ).first()
-                
-                if existing_citation:
-                    print(f"✅ 기존 인용 관계 사용: {rec_paper.paper_id} -> {common_ref_paper.paper_id}")
+            edges = [
+                (rec_paper.paper_id, common_ref_paper.paper_id)
+                for rec_paper in recommended_papers[:3]
+            ]
+            
+            # 기존 인용 관계를 (citing, cited) 쌍으로 한 번에 확인
+            existing_edges = set(
+                db.query(CitationGraph.citing_paper_id, CitationGraph.cited_paper_id).filter(
+                    tuple_(CitationGraph.citing_paper_id, CitationGraph.cited_paper_id).in_(edges)
+                ).all()
+            )
+            
+            citation_rows = []
+            for i, (citing_paper_id, _) in enumerate(edges):
+                if (citing_paper_id, common_ref_paper.paper_id) in existing_edges:
+                    print(f"✅ 기존 인용 관계 사용: {citing_paper_id} -> {common_ref_paper.paper_id}")
                     continue
                 
                 # 인용 관계 생성 (첫 번째는 influential, 나머지는 일반)
-                is_influential = 1 if rec_paper == recommended_papers[0] else 0
-                citation = CitationGraph(
-                    citing_paper_id=rec_paper.paper_id,
-                    cited_paper_id=common_ref_paper.paper_id,
-                    relation_type="cites",
-                    is_influential=is_influential
-                )
-                db.add(citation)
-                print(f"✅ 인용 관계 생성: paper_id={rec_paper.paper_id} -> {common_ref_paper.paper_id} (influential={is_influential})")
+                is_influential = 1 if i == 0 else 0
+                citation_rows.append({
+                    "citing_paper_id": citing_paper_id,
+                    "cited_paper_id": common_ref_paper.paper_id,
+                    "relation_type": "cites",
+                    "is_influential": is_influential
+                })
+                print(f"✅ 인용 관계 생성: paper_id={citing_paper_id} -> {common_ref_paper.paper_id} (influential={is_influential})")
             
-            db.commit()
+            if citation_rows:
+                db.bulk_insert_mappings(CitationGraph, citation_rows)
         
         # 6. 일부 논문에 메타데이터 추가
-        for i, paper in enumerate(created_papers[:2]):
-            existing_metadata = db.query(PaperMetadata).filter(
-                PaperMetadata.paper_id == paper.paper_id
-            ).first()
-            
-            if existing_metadata:
-                print(f"✅ 기존 메타데이터 사용: paper_id={paper.paper_id}")
+        metadata_paper_ids = [paper.paper_id for paper in created_papers[:2]]
+        existing_metadata_ids = {
+            paper_id
+            for (paper_id,) in db.query(PaperMetadata.paper_id).filter(
+                PaperMetadata.paper_id.in_(metadata_paper_ids)
+            ).all()
+        }
+        
+        keywords_json = orjson.dumps(["RAG", "Retrieval", "Knowledge-Intensive NLP", "Language Models"]).decode()
+        metadata_rows = []
+        for paper_id in metadata_paper_ids:
+            if paper_id in existing_metadata_ids:
+                print(f"✅ 기존 메타데이터 사용: paper_id={paper_id}")
                 continue
             
-            keywords_json = json.dumps(["RAG", "Retrieval", "Knowledge-Intensive NLP", "Language Models"])
-            metadata = PaperMetadata(
-                paper_id=paper.paper_id,
-                summary_level="intermediate",
-                summary_content="이 논문은 대규모 언어모델에 외부 지식 검색 기능을 결합한 Retrieval-Augmented Generation (RAG) 방법을 제안합니다.",
-                keywords=keywords_json,
-                citation_count=1523,
-                citation_velocity=45.2,
-                influential_citation_count=234
-            )
-            db.add(metadata)
-            print(f"✅ 메타데이터 생성: paper_id={paper.paper_id}")
+            metadata_rows.append({
+                "paper_id": paper_id,
+                "summary_level": "intermediate",
+                "summary_content": "이 논문은 대규모 언어모델에 외부 지식 검색 기능을 결합한 Retrieval-Augmented Generation (RAG) 방법을 제안합니다.",
+                "keywords": keywords_json,
+                "citation_count": 1523,
+                "citation_velocity": 45.2,
+                "influential_citation_count": 234
+            })
+            print(f"✅ 메타데이터 생성: paper_id={paper_id}")
+        
+        if metadata_rows:
+            db.bulk_insert_mappings(PaperMetadata, metadata_rows)
         
+        # 시드 전체를 하나의 트랜잭션으로 커밋 (중간에 실패하면 아래 except에서 전부 롤백)
         db.commit()
         
         print("\n" + "="*60)
@@ -1,8 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import api_router  # 통합 라우터
+from app.utils.kanana import close_kanana, kanana_pool_stats
+from app.utils.semantic_scholar import close_semantic_scholar
+from app.playmcp_client import playmcp_client
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 종료 시 공유 HTTP 클라이언트 정리
+    await close_kanana()
+    await close_semantic_scholar()
+    await playmcp_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS 반드시 먼저 설정
 origins = [
@@ -21,5 +35,10 @@ app.add_middleware(
 def root():
     return {"message": "AI Paper Backend Running!"}
 
+@app.get("/debug/kanana-pool")
+def kanana_pool():
+    # Kanana 동시 호출/대기 현황
+    return kanana_pool_stats()
+
 # 라우터 등록 (여기서 prefix="/api/v1"이면 여기에 맞춰야 함)
 app.include_router(api_router)
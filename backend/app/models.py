@@ -1,9 +1,19 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Float, Boolean, Index
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
+import orjson
 from .database import Base
 
 
+def parse_authors(raw) -> list:
+    """authors 컬럼(JSON 문자열)을 리스트로 파싱 (비어 있거나 잘못된 값이면 빈 리스트)"""
+    try:
+        parsed = orjson.loads(raw) if raw else []
+    except (orjson.JSONDecodeError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
 # --------------------------
 # User
 # --------------------------
@@ -34,7 +44,7 @@ class Paper(Base):
     authors = Column(Text, nullable=True)         # JSON 형태로 저장 가능
     published_date = Column(String(50), nullable=True)
     source = Column(String(50), nullable=True)    # arXiv / Semantic Scholar 등
-    external_id = Column(String(200), nullable=True)  # arXiv ID, DOI 등
+    external_id = Column(String(200), nullable=True, unique=True, index=True)  # arXiv ID("arXiv:<버전 없는 id>", canonical_arxiv_id로 정규화)
     pdf_url = Column(Text, nullable=True)
     abstract = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -59,6 +69,18 @@ class Paper(Base):
         cascade="all, delete-orphan"
     )
 
+    @property
+    def authors_list(self) -> list:
+        """authors(JSON 문자열)를 파싱한 리스트 (authors 값이 바뀌지 않았으면 파싱 결과 재사용)"""
+        raw = self.authors
+        cached = self.__dict__.get("_authors_cache")
+        if cached is not None and cached[0] == raw:
+            return cached[1]
+
+        parsed = parse_authors(raw)
+        self.__dict__["_authors_cache"] = (raw, parsed)
+        return parsed
+
 
 # --------------------------
 # PaperMetadata (논문 메타데이터 - 별도 테이블)
@@ -70,7 +92,9 @@ class PaperMetadata(Base):
     paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"), unique=True)
     
     # PDF 텍스트 및 요약
-    full_text = Column(Text, nullable=True)
+    # 수 MB에 달할 수 있으므로 기본 조회에서 제외 (접근할 때만 별도로 로드)
+    full_text = deferred(Column(Text, nullable=True))
+    prompt_text = Column(Text, nullable=True)      # LLM 프롬프트용으로 수집 시점에 미리 잘라둔 본문
     keywords = Column(Text, nullable=True)         # JSON 배열로 저장
     
     # 사용자가 선택한 난이도에 따라 하나만 저장
@@ -98,7 +122,8 @@ class Recommendation(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"))
-    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"))
+    # 논문 삭제 시 CASCADE 대상 조회용 인덱스 (user_id 쪽은 아래 복합 인덱스가 담당)
+    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"), index=True)
     recommended_at = Column(DateTime, default=datetime.utcnow)
 
     is_user_requested = Column(Boolean, default=False, nullable=False)
@@ -108,6 +133,11 @@ class Recommendation(Base):
     paper = relationship("Paper", back_populates="recommendations", foreign_keys=[paper_id])
     #위에 foreign_keys=[paper_id] 추가
 
+    __table_args__ = (
+        # 사용자별 기간 추천 조회 (user_id = ? AND recommended_at BETWEEN ? AND ?)
+        Index("ix_recommendation_user_recommended_at", "user_id", "recommended_at"),
+    )
+
 
 # --------------------------
 # UserReadPaper (사용자가 읽은 논문 로그)
@@ -117,12 +147,17 @@ class UserReadPaper(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"))
-    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"))
+    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"), index=True)
     read_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="read_papers")
     paper = relationship("Paper", back_populates="read_by_users")
 
+    __table_args__ = (
+        # 사용자별 최근 읽은 논문 조회 (user_id = ? ORDER BY read_at DESC LIMIT n)
+        Index("ix_user_read_paper_user_read_at", "user_id", read_at.desc()),
+    )
+
 
 # --------------------------
 # ChatHistory (논문별 Q&A 기록 - 별도 테이블)
@@ -132,7 +167,7 @@ class ChatHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"))
-    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"))
+    paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"), index=True)
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -140,6 +175,11 @@ class ChatHistory(Base):
     user = relationship("User", back_populates="chats")
     paper = relationship("Paper", back_populates="chats")
 
+    __table_args__ = (
+        # 사용자+논문별 채팅 기록 조회 (user_id = ? AND paper_id = ? ORDER BY created_at)
+        Index("ix_chat_user_paper_created", "user_id", "paper_id", "created_at"),
+    )
+
 
 # --------------------------
 # CitationGraph (논문 인용 관계)
@@ -149,7 +189,8 @@ class CitationGraph(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     citing_paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"))
-    cited_paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"))
+    # citing_paper_id로 시작하는 조회는 (citing, cited) 복합 인덱스를 사용하므로 cited 쪽만 별도 인덱스
+    cited_paper_id = Column(Integer, ForeignKey("papers.paper_id", ondelete="CASCADE"), index=True)
     
     # 인용 관계 정보
     relation_type = Column(String(50), nullable=True)  # "reference", "citation" 등
@@ -166,3 +207,8 @@ class CitationGraph(Base):
         foreign_keys=[cited_paper_id],
         back_populates="incoming_citations"
     )
+
+    __table_args__ = (
+        # 같은 인용 관계 중복 저장 방지 + (citing, cited) 쌍 조회
+        Index("ix_citation_graph_pair", "citing_paper_id", "cited_paper_id", unique=True),
+    )
@@ -2,6 +2,7 @@ import httpx
 from typing import Dict, Any
 import os
 from typing import Optional, List
+from app.utils.http import HTTP2_ENABLED
 
 
 class PlayMCPClient:
@@ -15,6 +16,13 @@ class PlayMCPClient:
         }
         self.session_id = None
         self.request_id = 0
+        # 요청마다 TCP/TLS 연결을 새로 맺지 않도록 클라이언트 하나를 재사용 (앱 종료 시 aclose)
+        # base_url을 쓰면 httpx가 끝에 "/"를 붙여 엔드포인트가 달라지므로 요청마다 전체 URL을 넘김
+        self._client = httpx.AsyncClient(
+            timeout=30.0,
+            headers=self.headers,
+            http2=HTTP2_ENABLED
+        )
     
     async def _make_request(self, method: str, params: Dict[str, Any]) -> Dict:
         """MCP 프로토콜 요청"""
@@ -27,23 +35,25 @@ class PlayMCPClient:
             "params": params
         }
         
-        headers = self.headers.copy()
-        if self.session_id:
-            headers["Mcp-Session-Id"] = self.session_id
+        # 공통 헤더는 클라이언트에 설정되어 있으므로 세션 ID만 추가
+        headers = {"Mcp-Session-Id": self.session_id} if self.session_id else None
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                self.base_url,
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            
-            # 세션 ID 저장 (initialize 응답에서)
-            if method == "initialize" and "Mcp-Session-Id" in response.headers:
-                self.session_id = response.headers["Mcp-Session-Id"]
-            
-            return response.json()
+        response = await self._client.post(
+            self.base_url,
+            headers=headers,
+            json=payload
+        )
+        response.raise_for_status()
+        
+        # 세션 ID 저장 (initialize 응답에서)
+        if method == "initialize" and "Mcp-Session-Id" in response.headers:
+            self.session_id = response.headers["Mcp-Session-Id"]
+        
+        return response.json()
+    
+    async def aclose(self):
+        """공유 HTTP 클라이언트의 연결 풀 정리"""
+        await self._client.aclose()
     
     async def initialize(self) -> Dict:
         """MCP 서버 초기화"""
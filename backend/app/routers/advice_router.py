@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Literal
@@ -71,8 +72,8 @@ async def get_advice(
         - level_change: 난이도 변경 제안
         - none: 조언 없음
     """
-    # 사용자 존재 여부 확인
-    user = db.query(User).filter(User.user_id == user_id).first()
+    # 사용자 존재 여부 확인 (엔티티 대신 user_id만 조회)
+    user = db.query(User.user_id).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,23 +90,38 @@ async def get_advice(
     return advice_result
 
 
-@router.post("/{user_id}/advice/accept-interest", response_model=AcceptInterestResponse)
-async def accept_interest_change(
+@router.get("/{user_id}/advice/study")
+async def stream_study_advice(
     user_id: int,
-    request: AcceptInterestRequest,
     db: Session = Depends(get_db)
 ):
     """
-    AI가 제안한 관심 분야 변경을 수락하고 사용자 정보를 업데이트합니다.
+    사용자의 최근 활동을 바탕으로 한 학습 코칭 메시지를 스트리밍으로 반환합니다.
+    (Kanana가 생성하는 텍스트 조각을 생성되는 즉시 전송)
     """
-    # 사용자 조회
-    user = db.query(User).filter(User.user_id == user_id).first()
+    # 사용자 존재 여부 확인 (엔티티 대신 user_id만 조회)
+    user = db.query(User.user_id).filter(User.user_id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="사용자를 찾을 수 없습니다."
         )
-    
+
+    return StreamingResponse(
+        advice_agent.generate_study_advice(db, user_id),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
+@router.post("/{user_id}/advice/accept-interest", response_model=AcceptInterestResponse)
+async def accept_interest_change(
+    user_id: int,
+    request: AcceptInterestRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    AI가 제안한 관심 분야 변경을 수락하고 사용자 정보를 업데이트합니다.
+    """
     # 빈 문자열 검증 추가
     if not request.new_interest or not request.new_interest.strip():
         raise HTTPException(
@@ -113,14 +129,23 @@ async def accept_interest_change(
             detail="관심 분야는 비어있을 수 없습니다."
         )
 
-    # 관심 분야 업데이트
-    user.interest = request.new_interest
+    # 관심 분야 업데이트 (조회 없이 UPDATE 한 번, 갱신된 행이 없으면 없는 사용자)
+    updated = (
+        db.query(User)
+        .filter(User.user_id == user_id)
+        .update({User.interest: request.new_interest}, synchronize_session=False)
+    )
+    if not updated:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="사용자를 찾을 수 없습니다."
+        )
     db.commit()
-    db.refresh(user)
 
     return AcceptInterestResponse(
-        user_id=user.user_id,
-        updated_interest=user.interest,
+        user_id=user_id,
+        updated_interest=request.new_interest,
         message="관심 분야가 성공적으로 변경되었습니다."
     )
 
@@ -134,14 +159,6 @@ async def accept_level_change(
     """
     AI가 제안한 난이도 변경을 수락하고 사용자 정보를 업데이트합니다.
     """
-    # 사용자 조회
-    user = db.query(User).filter(User.user_id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="사용자를 찾을 수 없습니다."
-        )
-
     # 난이도 검증 강화
     valid_levels = ["beginner", "intermediate", "advanced"]
     if not request.new_level or request.new_level not in valid_levels:
@@ -150,13 +167,22 @@ async def accept_level_change(
             detail=f"유효하지 않은 난이도입니다. 가능한 값: {', '.join(valid_levels)}"
         )
 
-    # 난이도 업데이트
-    user.level = request.new_level
+    # 난이도 업데이트 (조회 없이 UPDATE 한 번, 갱신된 행이 없으면 없는 사용자)
+    updated = (
+        db.query(User)
+        .filter(User.user_id == user_id)
+        .update({User.level: request.new_level}, synchronize_session=False)
+    )
+    if not updated:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="사용자를 찾을 수 없습니다."
+        )
     db.commit()
-    db.refresh(user)
 
     return AcceptLevelResponse(
-        user_id=user.user_id,
-        updated_level=user.level,
+        user_id=user_id,
+        updated_level=request.new_level,
         message="난이도가 성공적으로 변경되었습니다."
     )
\ No newline at end of file
@@ -3,16 +3,19 @@ arXiv ID 기반 논문 추가 라우터
 backend/app/routers/arxiv_summary_router.py
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session, joinedload
 from pydantic import BaseModel, Field
 from typing import Literal
-import json
+import asyncio
+import orjson
 import arxiv
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import Paper, PaperMetadata, User, Recommendation
 from app.agents.paper_description_agent import PaperDescriptionAgent
+from app.utils import semantic_scholar
+from app.utils.arxiv_ids import bare_arxiv_id, canonical_arxiv_id
 from datetime import datetime
 
 
@@ -37,7 +40,7 @@ def fetch_arxiv_paper(arxiv_id: str) -> dict:
     try:
         
         # arxiv_id 정규화 (접두사, 버전 번호 제거)
-        clean_id = arxiv_id.replace("arXiv:", "").replace("arxiv:", "").split("v")[0].strip()
+        clean_id = bare_arxiv_id(arxiv_id)
         
         # arXiv API 호출
         client = arxiv.Client()
@@ -59,28 +62,20 @@ def fetch_arxiv_paper(arxiv_id: str) -> dict:
         raise HTTPException(status_code=500, detail=f"arXiv API 오류: {str(e)}")
 
 
-def get_semantic_scholar_metadata(arxiv_id: str) -> dict:
+async def get_semantic_scholar_metadata(arxiv_id: str) -> dict:
     """Semantic Scholar API로 인용 정보 가져오기"""
-    import requests
+    data = await semantic_scholar.fetch_paper_async(
+        arxiv_id, "citationCount,citationVelocity,influentialCitationCount,year,venue", timeout=5
+    )
     
-    try:
-        url = f"https://api.semanticscholar.org/graph/v1/paper/arXiv:{arxiv_id}"
-        params = {
-            "fields": "citationCount,citationVelocity,influentialCitationCount,year,venue"
+    if data:
+        return {
+            "citation_count": data.get("citationCount", 0),
+            "citation_velocity": data.get("citationVelocity", 0),
+            "influential_citation_count": data.get("influentialCitationCount", 0),
+            "year": data.get("year"),
+            "venue": data.get("venue", "")
         }
-        response = requests.get(url, params=params, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "citation_count": data.get("citationCount", 0),
-                "citation_velocity": data.get("citationVelocity", 0),
-                "influential_citation_count": data.get("influentialCitationCount", 0),
-                "year": data.get("year"),
-                "venue": data.get("venue", "")
-            }
-    except Exception as e:
-        print(f"Semantic Scholar API 오류: {e}")
     
     # 기본값 반환
     return {
@@ -92,28 +87,40 @@ def get_semantic_scholar_metadata(arxiv_id: str) -> dict:
     }
 
 
-def save_paper_to_db(paper_data: dict, db: Session) -> int:
-    """논문을 DB에 저장하고 paper_id 반환"""
+def save_paper_to_db(paper_data: dict, db: Session, is_new: bool = False) -> int:
+    """
+    논문을 DB에 저장하고 paper_id 반환 (commit은 호출한 쪽에서 한 번에)
+    is_new: 호출한 쪽에서 DB에 없는 논문임을 이미 확인했으면 True (기존 논문 조회 생략)
+    """
     arxiv_id = paper_data.get("arxiv_id")
-    external_id = f"arXiv:{arxiv_id}"
+    external_id = canonical_arxiv_id(arxiv_id)
     
-    # 이미 존재하는 논문인지 확인
-    existing = db.query(Paper).filter(Paper.external_id == external_id).first()
+    # 이미 존재하는 논문인지 확인 (메타데이터까지 함께 조회)
+    existing = None
+    if not is_new:
+        existing = (
+            db.query(Paper)
+            .options(joinedload(Paper.paper_metadata))
+            .filter(Paper.external_id == external_id)
+            .first()
+        )
+    metadata = None
     
     if existing:
         paper_id = existing.paper_id
         # 기존 논문 업데이트
         existing.title = paper_data.get("title", existing.title)
-        existing.authors = json.dumps(paper_data.get("authors", []))
+        existing.authors = orjson.dumps(paper_data.get("authors", [])).decode()
         existing.published_date = paper_data.get("published_date")
         existing.source = "arXiv"
         existing.pdf_url = paper_data.get("pdf_url")
         existing.abstract = paper_data.get("abstract")
+        metadata = existing.paper_metadata
     else:
         # 새 논문 생성
         new_paper = Paper(
             title=paper_data.get("title", ""),
-            authors=json.dumps(paper_data.get("authors", [])),
+            authors=orjson.dumps(paper_data.get("authors", [])).decode(),
             published_date=paper_data.get("published_date"),
             source="arXiv",
             external_id=external_id,
@@ -124,11 +131,7 @@ def save_paper_to_db(paper_data: dict, db: Session) -> int:
         db.flush()
         paper_id = new_paper.paper_id
     
-    # PaperMetadata 저장/업데이트
-    metadata = db.query(PaperMetadata).filter(
-        PaperMetadata.paper_id == paper_id
-    ).first()
-    
+    # PaperMetadata 저장/업데이트 (paper_metadata.paper_id는 unique 제약으로 인덱스가 있음)
     if not metadata:
         metadata = PaperMetadata(paper_id=paper_id)
         db.add(metadata)
@@ -140,15 +143,32 @@ def save_paper_to_db(paper_data: dict, db: Session) -> int:
     
     # 키워드 저장
     if paper_data.get("categories"):
-        metadata.keywords = json.dumps(paper_data["categories"])
+        metadata.keywords = orjson.dumps(paper_data["categories"]).decode()
     
-    db.commit()
     return paper_id
 
 
+def describe_in_background(paper_data: dict, level: str, retries: int = 1):
+    """
+    요약 생성 + 저장 (응답 반환 후 BackgroundTasks에서 실행)
+    요청 세션은 응답과 함께 닫히므로 새 세션을 사용하고, 실패 시 retries회 재시도
+    """
+    for attempt in range(retries + 1):
+        db = SessionLocal()
+        try:
+            PaperDescriptionAgent(db=db).describe(paper_data, level=level)
+            print(f"✅ 요약 저장 완료: paper_id={paper_data.get('paper_id')}")
+            return
+        except Exception as e:
+            print(f"❌ 요약 생성 실패 (시도 {attempt + 1}/{retries + 1}): paper_id={paper_data.get('paper_id')}, {e}")
+        finally:
+            db.close()
+
+
 @router.post("/add", response_model=ArxivAddResponse)
 async def add_arxiv_paper(
     request: ArxivAddRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -180,11 +200,11 @@ async def add_arxiv_paper(
         print(f"👤 사용자: user_id={request.user_id}, level={level}")
 
         # arxiv_id 정규화
-        clean_id = request.arxiv_id.replace("arXiv:", "").replace("arxiv:", "").split("v")[0].strip()
-        external_id = f"arXiv:{clean_id}"
+        clean_id = bare_arxiv_id(request.arxiv_id)
+        external_id = canonical_arxiv_id(clean_id)
         
-        # DB에 이미 존재하는지 확인
-        existing_paper = db.query(Paper).filter(Paper.external_id == external_id).first()
+        # DB에 이미 존재하는지 확인 (paper_id만 조회)
+        existing_paper = db.query(Paper.paper_id).filter(Paper.external_id == external_id).first()
         
         if existing_paper:
             # 이미 학습한 논문
@@ -194,26 +214,24 @@ async def add_arxiv_paper(
         # 새로운 논문 처리
         print(f"🔍 새로운 논문 - arXiv 조회 중: {clean_id}")
         
-        # 1. arXiv에서 논문 정보 가져오기
-        paper_data = fetch_arxiv_paper(clean_id)
-        
-        # 2. Semantic Scholar에서 인용 정보 가져오기
-        print(f"📊 Semantic Scholar 메타데이터 조회 중...")
-        ss_metadata = get_semantic_scholar_metadata(paper_data["arxiv_id"])
+        # 1~2. arXiv 논문 정보와 Semantic Scholar 인용 정보를 동시에 조회
+        # (arxiv 라이브러리는 동기 호출이라 스레드에서 실행해 이벤트 루프를 막지 않음)
+        # arXiv에 없는 논문이면 fetch_arxiv_paper의 HTTPException(404)이 그대로 전파됨
+        print(f"📊 arXiv + Semantic Scholar 메타데이터 조회 중...")
+        paper_data, ss_metadata = await asyncio.gather(
+            asyncio.to_thread(fetch_arxiv_paper, clean_id),
+            get_semantic_scholar_metadata(clean_id)
+        )
         paper_data.update(ss_metadata)
         
         # 3. DB에 저장
         print(f"💾 DB에 저장 중...")
-        paper_id = save_paper_to_db(paper_data, db)
+        # (위에서 DB에 없는 것을 확인했으므로 다시 조회하지 않음)
+        paper_id = save_paper_to_db(paper_data, db, is_new=True)
         paper_data["paper_id"] = paper_id
         paper_data["db_paper_id"] = paper_id
         
-        # 4. 요약 생성
-        print(f"✍️  요약 생성 중 (level={level})...")  # ✅ 수정
-        description_agent = PaperDescriptionAgent(db=db)
-        description_agent.describe(paper_data, level=level)  # ✅ 수정
-        
-        # 5. Recommendation 테이블에 추가 (사용자가 직접 요청한 논문)
+        # 4. Recommendation 테이블에 추가 (사용자가 직접 요청한 논문)
         print(f"📝 Recommendation 테이블에 추가 중...")
         recommendation = Recommendation(
             user_id=request.user_id,
@@ -223,8 +241,14 @@ async def add_arxiv_paper(
             requested_paper_id=paper_id
         )
         db.add(recommendation)
+        
+        # 논문/메타데이터/추천 기록을 한 트랜잭션으로 저장
         db.commit()
         
+        # 5. 요약 생성은 응답을 보낸 뒤 백그라운드에서 실행 (LLM 호출 + 저장이 응답 시간에 포함되지 않음)
+        print(f"✍️  요약 생성 예약 (level={level})...")
+        background_tasks.add_task(describe_in_background, paper_data, level)
+        
         # 6. 성공 메시지 반환
         print(f"✅ 완료: paper_id={paper_id}")
         
@@ -235,6 +259,7 @@ async def add_arxiv_paper(
     except HTTPException:
         raise
     except Exception as e:
+        db.rollback()
         print(f"❌ 오류 발생: {e}")
         import traceback
         traceback.print_exc()
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from pydantic import BaseModel
+import orjson
 
-from app.agents.chatbot_agent import chatbot_agent
+from app.agents.chatbot_agent import chatbot_agent, HISTORY_TURNS
 from app.database import get_db
 from app.models import ChatHistory
 
@@ -37,7 +40,9 @@ class ChatResponse(BaseModel):
 @router.post("", response_model=ChatResponse)
 async def chat_with_paper(paper_id: int, request: ChatRequest, db: Session = Depends(get_db)):
     # 1. 이전 채팅 기록 조회 (최신 2개)
-    history = chatbot_agent.get_chat_history(db, request.user_id, paper_id)
+    history = await run_in_threadpool(
+        chatbot_agent.get_chat_history, db, request.user_id, paper_id, HISTORY_TURNS
+    )
 
     # 2. 새 질문에 대한 답변 생성
     new_chat = await chatbot_agent.generate_response(
@@ -48,28 +53,12 @@ async def chat_with_paper(paper_id: int, request: ChatRequest, db: Session = Dep
         relevant_history=history
     )
 
+    # generate_response가 ChatHistory 저장(commit/refresh)까지 마친 객체를 반환
     if not new_chat:
         raise HTTPException(status_code=500, detail="답변 생성 실패")
 
-    # --- 데이터베이스 저장 로직 (수정된 부분) ---
-    try:
-        # 1. new_chat 객체를 현재 세션에 추가 (Persistence 확보)
-        db.add(new_chat)
-        
-        # 2. DB에 커밋하여 created_at 필드 자동 생성
-        db.commit()
-        
-        # 3. 객체를 갱신하여 DB가 생성한 created_at 값을 불러옴 (NoneType 오류 방지)
-        db.refresh(new_chat)
-
-    except Exception as e:
-        # 실패 시 롤백 및 에러 반환
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"데이터베이스에 채팅 기록 저장 실패 (Failed to save chat history to database): {e}")
-    # ----------------------------------------------
-
     # 3. 응답용 이전 대화 변환 (최신 2개)
-    recent_history = history[-2:] 
+    recent_history = history[-HISTORY_TURNS:]
     previous_chats = [{"question": chat.question, "answer": chat.answer} for chat in recent_history]
 
     # 4. Response 생성
@@ -82,3 +71,55 @@ async def chat_with_paper(paper_id: int, request: ChatRequest, db: Session = Dep
         context_used={"previous_chats": previous_chats}  
     )
 
+
+# ------------------------------------
+# 챗봇 스트리밍 엔드포인트 (SSE)
+# ------------------------------------
+def _sse(data: dict, event: str = None) -> str:
+    """Server-Sent Events 한 건 (data는 JSON 한 줄로 직렬화, 토큰마다 호출되므로 orjson 사용)"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {orjson.dumps(data).decode()}\n\n"
+
+
+@router.post("/stream")
+async def chat_with_paper_stream(paper_id: int, request: ChatRequest, db: Session = Depends(get_db)):
+    """
+    답변을 토큰 단위로 바로 전달 (첫 글자가 전체 답변 생성 전에 도착)
+    - data: {"token": "..."} 를 생성되는 대로 전송
+    - 스트림이 끝나면 ChatHistory에 저장하고 event: done 으로 chat_id 전달
+    """
+    history = await run_in_threadpool(
+        chatbot_agent.get_chat_history, db, request.user_id, paper_id, HISTORY_TURNS
+    )
+
+    async def event_stream():
+        pieces = []
+        async for piece in chatbot_agent.stream_response(
+            db=db,
+            user_id=request.user_id,
+            paper_id=paper_id,
+            question=request.question,
+            relevant_history=history
+        ):
+            pieces.append(piece)
+            yield _sse({"token": piece})
+
+        # 응답 전송이 끝난 뒤에는 요청 세션 대신 새 세션으로 저장
+        new_chat = await run_in_threadpool(
+            chatbot_agent.save_chat_in_new_session,
+            request.user_id,
+            paper_id,
+            request.question,
+            "".join(pieces)
+        )
+        if not new_chat:
+            yield _sse({"detail": "데이터베이스에 채팅 기록 저장 실패"}, event="error")
+            return
+
+        yield _sse(
+            # datetime은 orjson이 ISO 8601 문자열로 직렬화
+            {"chat_id": new_chat.id, "created_at": new_chat.created_at},
+            event="done"
+        )
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
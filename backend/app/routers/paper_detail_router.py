@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc, and_
 from typing import List, Optional
 from datetime import datetime, date, timedelta
-import json
+import orjson
 from app.models import UserReadPaper
 from app.playmcp_client import playmcp_client
 
@@ -70,11 +70,11 @@ def parse_json_field(field_value: Optional[str]) -> List[str]:
     if not field_value:
         return []
     try:
-        parsed = json.loads(field_value)
+        parsed = orjson.loads(field_value)
         if isinstance(parsed, list):
             return parsed
         return []
-    except (json.JSONDecodeError, TypeError):
+    except (orjson.JSONDecodeError, TypeError):
         return []
 
 
@@ -110,7 +110,7 @@ async def get_paper_history(user_id: int, db: Session = Depends(get_db)):
         if not paper:
             continue
         
-        authors = parse_json_field(paper.authors)
+        authors = paper.authors_list
         recommended_at_str = format_date(rec.recommended_at)
         if not recommended_at_str:
             continue
@@ -170,7 +170,7 @@ async def get_paper_detail(paper_id: int, user_id: int, db: Session = Depends(ge
     ).order_by(ChatHistory.created_at).all()
     
     # authors 파싱
-    authors = parse_json_field(paper.authors)
+    authors = paper.authors_list
     
     # summary 구성
     summary = None
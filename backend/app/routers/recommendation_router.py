@@ -4,7 +4,6 @@ from sqlalchemy import and_, func
 from pydantic import BaseModel, Field
 from typing import List, Literal
 from datetime import datetime, date, timedelta
-import json
 
 from app.utils.kanana import call_kanana
 from starlette.concurrency import run_in_threadpool
@@ -92,19 +91,6 @@ class TodayRelationsResponse(BaseModel):
 
 # ==================== 유틸리티 함수 ====================
 
-def parse_json_field(field_value: str) -> List[str]:
-    """JSON 문자열을 파싱하여 리스트로 반환"""
-    if not field_value:
-        return []
-    try:
-        parsed = json.loads(field_value)
-        if isinstance(parsed, list):
-            return parsed
-        return []
-    except (json.JSONDecodeError, TypeError):
-        return []
-
-
 def format_date(date_obj: datetime) -> str:
     """datetime을 YYYY-MM-DD 형식으로 변환"""
     if isinstance(date_obj, datetime):
@@ -146,7 +132,7 @@ async def get_today_recommendations(user_id: int, db: Session = Depends(get_db))
             continue
         
         # authors 파싱
-        authors = parse_json_field(paper.authors) if paper.authors else []
+        authors = paper.authors_list
         
         # recommended_at을 YYYY-MM-DD 형식으로 변환
         recommended_at_str = format_date(rec.recommended_at)
@@ -0,0 +1,34 @@
+import re
+
+# ------------------------------------
+# arXiv ID 정규화
+# ------------------------------------
+# Paper.external_id는 항상 "arXiv:<버전 없는 ID>" 한 가지 형태로 저장/조회합니다.
+# (검색 결과는 "2301.00001v2", 사용자 입력은 "arXiv:2301.00001" 등 형태가 제각각이라
+#  같은 논문이 중복 저장되거나 조회에 실패하는 것을 막기 위함)
+
+ARXIV_PREFIX = "arXiv:"
+
+_PREFIX_RE = re.compile(r"^arxiv:\s*", re.IGNORECASE)
+_URL_RE = re.compile(r"arxiv\.org/(?:abs|pdf)/(.+?)(?:\.pdf)?/?$", re.IGNORECASE)
+_VERSION_RE = re.compile(r"v\d+$", re.IGNORECASE)
+
+
+def bare_arxiv_id(raw: str) -> str:
+    """
+    접두사/URL/버전을 뗀 arXiv ID
+    예: "arXiv:2301.00001v2", "http://arxiv.org/abs/2301.00001v1" -> "2301.00001"
+        "hep-th/9901001v3" -> "hep-th/9901001"
+    """
+    value = raw.strip()
+    match = _URL_RE.search(value)
+    if match:
+        value = match.group(1)
+    value = _PREFIX_RE.sub("", value)
+    # 구형 ID의 분야명(hep-th 등)도 소문자로 통일
+    return _VERSION_RE.sub("", value.strip()).lower()
+
+
+def canonical_arxiv_id(raw: str) -> str:
+    """Paper.external_id에 저장/조회할 정규 형태 ("arXiv:2301.00001")"""
+    return f"{ARXIV_PREFIX}{bare_arxiv_id(raw)}"
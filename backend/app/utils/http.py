@@ -0,0 +1,41 @@
+import importlib.util
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ------------------------------------
+# 외부 API 호출용 requests 세션
+# ------------------------------------
+# 모듈마다 세션 하나를 만들어 keep-alive 연결을 재사용하고,
+# 429/5xx는 지수 백오프로 재시도합니다. (Retry-After 헤더가 있으면 그 값을 따름)
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# httpx 클라이언트의 HTTP/2 사용 여부
+# (동시 요청을 하나의 TLS 연결 위 스트림으로 다중화. h2 패키지가 없으면 HTTP/1.1 keep-alive 풀로 동작)
+HTTP2_ENABLED = importlib.util.find_spec("h2") is not None
+
+
+def make_retry_session(
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    allowed_methods=("GET",),
+    pool_maxsize: int = 32
+) -> requests.Session:
+    """재시도/연결 풀이 설정된 세션 생성 (조회용 POST도 재시도하려면 allowed_methods에 포함)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=list(allowed_methods),
+            raise_on_status=False
+        ),
+        pool_connections=16,
+        pool_maxsize=pool_maxsize
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,36 +1,228 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Optional
+import asyncio
+import httpx
 import os
+import threading
 from dotenv import load_dotenv
+from app.utils.http import HTTP2_ENABLED
 
 load_dotenv()
 
 API_KEY = os.getenv("KANANA_API_KEY", "")
 
+BASE_URL = "https://kanana-2-30b-a3b-s7nyu.a2s-endpoint.kr-central-2.kakaocloud.com/v1"
+
+# 동기 클라이언트: 파이프라인/스레드풀의 동시 호출들이 keep-alive 연결 풀을 공유
+# (요약 생성/재시도마다 TCP/TLS 연결을 새로 맺지 않도록 풀 크기를 스레드 수에 맞춰 둠)
 client = OpenAI(
-    base_url="https://kanana-2-30b-a3b-s7nyu.a2s-endpoint.kr-central-2.kakaocloud.com/v1",
-    api_key=API_KEY
+    base_url=BASE_URL,
+    api_key=API_KEY,
+    http_client=httpx.Client(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+)
+
+# 비동기 클라이언트: 동시 요청들이 keep-alive 연결 풀을 공유 (이벤트 루프를 막지 않음)
+async_client = AsyncOpenAI(
+    base_url=BASE_URL,
+    api_key=API_KEY,
+    http_client=httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=httpx.Timeout(30.0, connect=5.0)
+    )
 )
 
+# Kanana 동시 호출 수 상한 (챗봇/요약/선정 에이전트 전체 공유)
+# 동기 호출은 스레드에서, 비동기 호출은 이벤트 루프에서 실행되므로 세마포어를 각각 둠
+KANANA_CONCURRENCY = int(os.getenv("KANANA_CONCURRENCY", "8"))
+_sync_slots = threading.BoundedSemaphore(KANANA_CONCURRENCY)
+_async_slots = asyncio.Semaphore(KANANA_CONCURRENCY)
+_stats_lock = threading.Lock()
+_stats = {"sync_in_flight": 0, "async_in_flight": 0, "sync_waiting": 0, "async_waiting": 0, "total_calls": 0}
+
+_model_id: Optional[str] = None
+_model_id_lock = threading.Lock()
+_async_model_id: Optional[str] = None
+
 SYSTEM_PROMPT = """당신은 카카오(kakao)에서 개발된 친절한 인공지능 언어모델이고 이름은 카나나(kanana)입니다. 
 2024년 7월 이후 사건에 대한 정보는 알 수 없다고 답해야합니다. 
 현재 시간, 날짜, 사건 등 외부 정보를 참조해야 답할 수 있는 질문에는 외부 검색을 사용하라고 추천하세요. 
 URL에 기반한 사용자 질의의 경우 사용자에게 URL에 있는 정보를 직접 입력하도록 요청합니다. 
 카나나(kanana)의 모델 사이즈나 파라미터 정보는 비공개입니다."""
 
+# 논문 본문을 프롬프트에 넣을 때의 최대 길이 (약 8k 토큰 분량)
+PROMPT_TEXT_MAX_CHARS = 24000
+
+
+def make_prompt_text(full_text: Optional[str]) -> Optional[str]:
+    """논문 본문을 프롬프트용 길이로 자르기 (요청마다가 아니라 수집 시점에 한 번만 호출)"""
+    if not full_text:
+        return None
+    return full_text[:PROMPT_TEXT_MAX_CHARS]
+
+
+# 토크나이저 없이 쓰는 토큰 수 근사치 (ASCII 약 4자당 1토큰, 한글 등 그 외 문자는 1자당 1토큰)
+ASCII_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """텍스트의 대략적인 토큰 수"""
+    if not text:
+        return 0
+    ascii_count = len(text.encode("ascii", "ignore"))
+    return -(-ascii_count // ASCII_CHARS_PER_TOKEN) + (len(text) - ascii_count)
+
+
+def truncate_to_tokens(text: Optional[str], max_tokens: int) -> str:
+    """대략 max_tokens 토큰 분량까지만 앞에서부터 자르기 (글자 수가 아니라 토큰 예산 기준)"""
+    if not text:
+        return ""
+    # 모든 문자가 1토큰이어도 예산 안이면 그대로 사용
+    if len(text) <= max_tokens:
+        return text
+    # ASCII만이라도 예산을 넘는 부분은 미리 잘라 두고 나머지만 계산
+    text = text[:max_tokens * ASCII_CHARS_PER_TOKEN]
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    budget = max_tokens * ASCII_CHARS_PER_TOKEN
+    for i, ch in enumerate(text):
+        budget -= 1 if ch.isascii() else ASCII_CHARS_PER_TOKEN
+        if budget < 0:
+            return text[:i]
+    return text
+
+
+def _update_stats(**deltas: int):
+    with _stats_lock:
+        for key, delta in deltas.items():
+            _stats[key] += delta
+
+
+@contextmanager
+def _sync_slot():
+    """동기 호출용 동시 실행 슬롯"""
+    _update_stats(sync_waiting=1)
+    with _sync_slots:
+        _update_stats(sync_waiting=-1, sync_in_flight=1, total_calls=1)
+        try:
+            yield
+        finally:
+            _update_stats(sync_in_flight=-1)
+
+
+@asynccontextmanager
+async def _async_slot():
+    """비동기 호출용 동시 실행 슬롯"""
+    _update_stats(async_waiting=1)
+    async with _async_slots:
+        _update_stats(async_waiting=-1, async_in_flight=1, total_calls=1)
+        try:
+            yield
+        finally:
+            _update_stats(async_in_flight=-1)
+
+
+def kanana_pool_stats() -> Dict[str, int]:
+    """동시 호출 현황 (디버그 엔드포인트용)"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["concurrency_limit"] = KANANA_CONCURRENCY
+    stats["http2"] = HTTP2_ENABLED
+    return stats
+
+
+def _get_model_id() -> str:
+    """배포된 모델 ID (최초 1회만 조회 후 재사용)"""
+    global _model_id
+    if _model_id is None:
+        with _model_id_lock:
+            if _model_id is None:
+                _model_id = client.models.list().data[0].id
+    return _model_id
+
+
 def call_kanana(prompt: str, system_prompt: str = SYSTEM_PROMPT, temperature: float = 0, max_tokens: int = 1024) -> str:
     """Kanana 모델 호출 함수"""
     try:
-        response = client.chat.completions.create(
-            model=client.models.list().data[0].id,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
+        with _sync_slot():
+            response = client.chat.completions.create(
+                model=_get_model_id(),
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
         return response.choices[0].message.content
     except Exception as e:
         print(f"Kanana 호출 오류: {e}")
         return ""
 
+
+
+async def _get_async_model_id() -> str:
+    """배포된 모델 ID (최초 1회만 조회 후 재사용)"""
+    global _async_model_id
+    if _async_model_id is None:
+        models = await async_client.models.list()
+        _async_model_id = models.data[0].id
+    return _async_model_id
+
+
+async def call_kanana_async(prompt: str, system_prompt: str = SYSTEM_PROMPT, temperature: float = 0, max_tokens: int = 1024, cache_key: Optional[str] = None) -> str:
+    """Kanana 모델 비동기 호출 함수
+
+    cache_key: 같은 prefix(예: 같은 논문 본문)를 공유하는 요청끼리 묶기 위한 키.
+               서버가 지원하면 prefix KV 캐시를 같은 키의 요청에 재사용합니다.
+    """
+    try:
+        async with _async_slot():
+            response = await async_client.chat.completions.create(
+                model=await _get_async_model_id(),
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                extra_body={"prompt_cache_key": cache_key} if cache_key else None
+            )
+        return response.choices[0].message.content
+    except Exception as e:
+        print(f"Kanana 호출 오류: {e}")
+        return ""
+
+
+async def call_kanana_stream_async(prompt: str, system_prompt: str = SYSTEM_PROMPT, temperature: float = 0, max_tokens: int = 1024, cache_key: Optional[str] = None) -> AsyncIterator[str]:
+    """Kanana 모델 비동기 스트리밍 호출 함수 (생성되는 토큰 조각을 순서대로 yield, cache_key는 call_kanana_async와 동일)"""
+    try:
+        async with _async_slot():
+            stream = await async_client.chat.completions.create(
+                model=await _get_async_model_id(),
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                extra_body={"prompt_cache_key": cache_key} if cache_key else None
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        print(f"Kanana 스트리밍 호출 오류: {e}")
+
+
+async def close_kanana():
+    """앱 종료 시 동기/비동기 클라이언트의 연결 풀 정리"""
+    client.close()
+    await async_client.close()
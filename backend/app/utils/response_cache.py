@@ -0,0 +1,68 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# ------------------------------------
+# 챗봇 답변 캐시 (논문별 같은 질문 재사용)
+# ------------------------------------
+# 문자 bigram 유사도 같은 표면적 비교로는 "장점"/"단점"처럼 뜻이 반대인 질문도 거의 같게 나오므로
+# 임베딩 모델 없이 유사 질문을 찾지 않고, 정규화한 질문이 정확히 같을 때만 재사용합니다.
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# 질문 끝의 물음표/마침표 등만 무시 ("C++"/"C#"처럼 질문 안의 기호는 의미가 있으므로 유지)
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.。？！]+$")
+
+
+def normalize_question(question: str) -> str:
+    """질문 정규화 (소문자, 공백 정리, 끝의 문장부호 제거)"""
+    question = _WHITESPACE_RE.sub(" ", question.lower()).strip()
+    return _TRAILING_PUNCT_RE.sub("", question)
+
+
+class ResponseCache:
+    """
+    (paper_id, 정규화된 질문) 기준 답변 캐시.
+    논문별로 최근 max_per_paper개의 질문만 유지합니다. (LRU)
+    이전 대화에 따라 답변이 달라지는 질문은 호출하는 쪽에서 캐시를 사용하지 않아야 합니다.
+    """
+
+    def __init__(self, max_per_paper: int = 200, max_papers: int = 1000):
+        self.max_per_paper = max_per_paper
+        self.max_papers = max_papers
+        self._entries: "OrderedDict[int, OrderedDict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, paper_id: int, question: str) -> Optional[str]:
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        with self._lock:
+            entries = self._entries.get(paper_id)
+            if not entries:
+                return None
+            self._entries.move_to_end(paper_id)
+
+            answer = entries.get(normalized)
+            if answer is not None:
+                entries.move_to_end(normalized)
+            return answer
+
+    def put(self, paper_id: int, question: str, answer: str) -> None:
+        normalized = normalize_question(question)
+        if not normalized or not answer:
+            return
+
+        with self._lock:
+            entries = self._entries.get(paper_id)
+            if entries is None:
+                entries = self._entries[paper_id] = OrderedDict()
+                if len(self._entries) > self.max_papers:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(paper_id)
+
+            entries[normalized] = answer
+            entries.move_to_end(normalized)
+            if len(entries) > self.max_per_paper:
+                entries.popitem(last=False)
@@ -0,0 +1,155 @@
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+import orjson
+from cachetools import TTLCache
+
+from app.utils.http import HTTP2_ENABLED, make_retry_session
+
+# ------------------------------------
+# Semantic Scholar API 호출 (arXiv ID 기준, 프로세스 내 TTL 캐시)
+# ------------------------------------
+# search → select → analyze 흐름에서 같은 논문을 여러 번 조회하므로
+# (arXiv ID, fields) 단위로 1시간 동안 응답을 재사용합니다.
+
+SEMANTIC_SCHOLAR_BASE = "https://api.semanticscholar.org/graph/v1"
+
+# /paper/batch 한 번에 보낼 수 있는 최대 ID 수
+BATCH_SIZE = 500
+
+# 모든 에이전트가 공유하는 세션 (keep-alive 연결 재사용, 429/5xx 재시도)
+# /paper/batch는 조회용 POST라 재시도해도 안전하므로 POST도 재시도 대상에 포함
+_session = make_retry_session(allowed_methods=("GET", "POST"))
+
+# async 엔드포인트용 클라이언트 (이벤트 루프를 막지 않고 연결 재사용, 앱 종료 시 close_semantic_scholar로 정리)
+# 사용자 요청 경로라 429/5xx 백오프 재시도는 하지 않고 연결 실패만 재시도
+_async_client = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(
+        http2=HTTP2_ENABLED,
+        retries=2,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    )
+)
+
+_SS_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=3600)
+_ss_cache_lock = threading.Lock()
+
+
+def _cache_get(arxiv_id: str, fields: str) -> Optional[Dict]:
+    with _ss_cache_lock:
+        return _SS_CACHE.get((arxiv_id, fields))
+
+
+def _cache_put(arxiv_id: str, fields: str, data: Dict) -> None:
+    with _ss_cache_lock:
+        _SS_CACHE[(arxiv_id, fields)] = data
+
+
+def fetch_paper(arxiv_id: str, fields: str, timeout: float = 10) -> Optional[Dict]:
+    """
+    논문 1편 조회 (캐시 우선)
+    요청 실패/오류 시 None (실패한 응답은 캐시하지 않음)
+    """
+    cached = _cache_get(arxiv_id, fields)
+    if cached is not None:
+        return cached
+
+    try:
+        response = _session.get(
+            f"{SEMANTIC_SCHOLAR_BASE}/paper/arXiv:{arxiv_id}",
+            params={"fields": fields},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            print(
+                f"Semantic Scholar 조회 실패 (arXiv:{arxiv_id}, "
+                f"status={response.status_code}, text={response.text[:200]!r})"
+            )
+            return None
+        data = orjson.loads(response.content)
+    except Exception as e:
+        print(f"Semantic Scholar 조회 오류 (arXiv:{arxiv_id}): {e}")
+        return None
+
+    _cache_put(arxiv_id, fields, data)
+    return data
+
+
+async def fetch_paper_async(arxiv_id: str, fields: str, timeout: float = 10) -> Optional[Dict]:
+    """fetch_paper의 비동기 버전 (같은 캐시 사용)"""
+    cached = _cache_get(arxiv_id, fields)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await _async_client.get(
+            f"{SEMANTIC_SCHOLAR_BASE}/paper/arXiv:{arxiv_id}",
+            params={"fields": fields},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            print(
+                f"Semantic Scholar 조회 실패 (arXiv:{arxiv_id}, "
+                f"status={response.status_code}, text={response.text[:200]!r})"
+            )
+            return None
+        data = orjson.loads(response.content)
+    except Exception as e:
+        print(f"Semantic Scholar 조회 오류 (arXiv:{arxiv_id}): {e}")
+        return None
+
+    _cache_put(arxiv_id, fields, data)
+    return data
+
+
+def fetch_papers_batch(arxiv_ids: List[str], fields: str, timeout: float = 15) -> Optional[List[Dict]]:
+    """
+    POST /paper/batch로 여러 논문을 한 번에 조회 (캐시에 없는 ID만 요청)
+    요청 순서대로 반환하며 Semantic Scholar에 없는 논문은 빈 dict
+    - batch 요청이 4xx로 거절되면 None (호출한 쪽에서 논문별 조회로 대체)
+    - 429/5xx/네트워크 오류는 세션에서 재시도한 뒤에도 실패한 것이므로 논문별 조회도 같은 이유로
+      실패할 가능성이 높아 None 대신 조회하지 못한 논문을 빈 dict로 채움 (캐시하지 않음)
+    """
+    results: Dict[str, Dict] = {}
+    missing: List[str] = []
+    # 같은 ID가 여러 번 들어와도 캐시 확인/요청은 한 번만 (순서 유지 중복 제거)
+    for arxiv_id in dict.fromkeys(arxiv_ids):
+        cached = _cache_get(arxiv_id, fields)
+        if cached is not None:
+            results[arxiv_id] = cached
+        else:
+            missing.append(arxiv_id)
+
+    try:
+        for start in range(0, len(missing), BATCH_SIZE):
+            chunk = missing[start:start + BATCH_SIZE]
+            response = _session.post(
+                f"{SEMANTIC_SCHOLAR_BASE}/paper/batch",
+                params={"fields": fields},
+                json={"ids": [f"ARXIV:{aid}" for aid in chunk]},
+                timeout=timeout
+            )
+            if response.status_code != 200:
+                print(
+                    f"Semantic Scholar batch 조회 실패 "
+                    f"(status={response.status_code}, text={response.text[:200]!r})"
+                )
+                if 400 <= response.status_code < 500 and response.status_code != 429:
+                    return None
+                break
+
+            for arxiv_id, data in zip(chunk, orjson.loads(response.content)):
+                data = data or {}
+                results[arxiv_id] = data
+                _cache_put(arxiv_id, fields, data)
+    except Exception as e:
+        print(f"Semantic Scholar batch 조회 오류: {e}")
+
+    return [results.get(arxiv_id, {}) for arxiv_id in arxiv_ids]
+
+
+async def close_semantic_scholar():
+    """앱 종료 시 세션/비동기 클라이언트의 연결 풀 정리"""
+    _session.close()
+    await _async_client.aclose()
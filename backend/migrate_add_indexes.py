@@ -0,0 +1,70 @@
+from sqlalchemy import text
+from app.database import engine # engine 객체가 DB 연결 정보를 가지고 있다고 가정
+
+# 기존 DB에 조회 성능용 인덱스를 추가합니다. (새로 만드는 DB는 create_all 시 models.py의 Index로 생성됨)
+INDEXES = [
+    # 사용자별 최근 읽은 논문 조회 (AdviceAgent._get_analysis_data)
+    """
+    CREATE INDEX IF NOT EXISTS ix_user_read_paper_user_read_at
+    ON user_read_papers (user_id, read_at DESC)
+    """,
+    # 사용자+논문별 채팅 기록 조회 (ChatbotAgent.get_chat_history)
+    """
+    CREATE INDEX IF NOT EXISTS ix_chat_user_paper_created
+    ON chat_history (user_id, paper_id, created_at)
+    """,
+    # 사용자별 오늘/기간 추천 조회 (recommendation_router, paper_detail_router)
+    """
+    CREATE INDEX IF NOT EXISTS ix_recommendation_user_recommended_at
+    ON recommendations (user_id, recommended_at)
+    """,
+    # 인용 관계 (citing, cited) 쌍 조회 + 중복 방지
+    # 기존에 같은 쌍이 여러 행 있으면 실패하므로 먼저 중복을 정리해야 함
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_citation_graph_pair
+    ON citation_graph (citing_paper_id, cited_paper_id)
+    """,
+    # 논문 기준 조회 (피인용 관계 incoming_citations, 논문 삭제 시 ON DELETE CASCADE)
+    # user_id/citing_paper_id로 시작하는 조회는 위의 복합 인덱스가 담당
+    """
+    CREATE INDEX IF NOT EXISTS ix_citation_graph_cited_paper_id
+    ON citation_graph (cited_paper_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_recommendations_paper_id
+    ON recommendations (paper_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_user_read_papers_paper_id
+    ON user_read_papers (paper_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_chat_history_paper_id
+    ON chat_history (paper_id)
+    """,
+]
+# papers.external_id의 unique 인덱스는 기존 값 정규화가 먼저 필요하므로 migrate_canonical_external_id.py에서 생성
+
+def add_indexes():
+    """조회 성능용 인덱스 추가"""
+    
+    with engine.connect() as conn:
+        # 트랜잭션 시작
+        trans = conn.begin()
+        
+        try:
+            for ddl in INDEXES:
+                conn.execute(text(ddl))
+            
+            trans.commit()
+            print(f"✅ 마이그레이션 성공: 인덱스 {len(INDEXES)}개 추가 완료")
+            
+        except Exception as e:
+            trans.rollback()
+            print(f"❌ 마이그레이션 실패: {e}")
+            raise
+
+if __name__ == "__main__":
+    print("\n=== 인덱스 마이그레이션 시작 ===\n")
+    add_indexes()
+    print("\n=== 마이그레이션 완료 ===\n")
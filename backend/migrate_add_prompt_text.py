@@ -0,0 +1,37 @@
+from sqlalchemy import text
+from app.database import engine # engine 객체가 DB 연결 정보를 가지고 있다고 가정
+from app.utils.kanana import PROMPT_TEXT_MAX_CHARS
+
+def add_prompt_text_column():
+    """paper_metadata 테이블에 프롬프트용 본문(prompt_text) 컬럼 추가 및 기존 데이터 채우기"""
+    
+    with engine.connect() as conn:
+        # 트랜잭션 시작
+        trans = conn.begin()
+        
+        try:
+            # 1. prompt_text 컬럼 추가 (NULL 허용)
+            conn.execute(text("""
+                ALTER TABLE paper_metadata 
+                ADD COLUMN IF NOT EXISTS prompt_text TEXT
+            """))
+            
+            # 2. 기존 full_text로 prompt_text 채우기
+            conn.execute(text("""
+                UPDATE paper_metadata 
+                SET prompt_text = LEFT(full_text, :max_chars) 
+                WHERE prompt_text IS NULL AND full_text IS NOT NULL
+            """), {"max_chars": PROMPT_TEXT_MAX_CHARS})
+            
+            trans.commit()
+            print("✅ 마이그레이션 성공: paper_metadata 테이블에 prompt_text 컬럼 추가 완료")
+            
+        except Exception as e:
+            trans.rollback()
+            print(f"❌ 마이그레이션 실패: {e}")
+            raise
+
+if __name__ == "__main__":
+    print("\n=== paper_metadata 테이블 마이그레이션 시작 ===\n")
+    add_prompt_text_column()
+    print("\n=== 마이그레이션 완료 ===\n")
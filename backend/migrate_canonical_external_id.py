@@ -0,0 +1,61 @@
+from sqlalchemy import text
+from app.database import engine # engine 객체가 DB 연결 정보를 가지고 있다고 가정
+
+# 기존 papers.external_id의 arXiv ID를 canonical_arxiv_id와 같은 형태("arXiv:<버전 없는 id>")로 바꾸고
+# external_id에 unique 인덱스를 만듭니다. (새로 만드는 DB는 create_all 시 models.py 설정으로 생성됨)
+NORMALIZE_SQL = r"""
+UPDATE papers
+SET external_id = 'arXiv:' || lower(regexp_replace(
+    regexp_replace(btrim(external_id), '^arxiv:\s*', '', 'i'),
+    'v[0-9]+$', '', 'i'
+))
+WHERE external_id ~* '^\s*arxiv:'
+"""
+
+DUPLICATES_SQL = """
+SELECT external_id, array_agg(paper_id ORDER BY paper_id)
+FROM papers
+WHERE external_id IS NOT NULL
+GROUP BY external_id
+HAVING count(*) > 1
+"""
+
+UNIQUE_INDEX_DDL = [
+    "DROP INDEX IF EXISTS ix_papers_external_id",
+    "CREATE UNIQUE INDEX ix_papers_external_id ON papers (external_id)",
+]
+
+def migrate_external_id():
+    """external_id 정규화 + unique 인덱스 생성"""
+    
+    with engine.connect() as conn:
+        # 트랜잭션 시작
+        trans = conn.begin()
+        
+        try:
+            result = conn.execute(text(NORMALIZE_SQL))
+            print(f"✅ external_id 정규화: {result.rowcount}건")
+            
+            # 정규화 후 같은 논문이 여러 행으로 남아 있으면 인덱스를 만들 수 없으므로 중단
+            # (추천/채팅 기록이 paper_id를 참조하므로 자동으로 지우지 않고 수동 병합)
+            duplicates = conn.execute(text(DUPLICATES_SQL)).fetchall()
+            if duplicates:
+                for external_id, paper_ids in duplicates:
+                    print(f"⚠️  중복 논문: external_id={external_id}, paper_ids={paper_ids}")
+                raise RuntimeError(f"중복 external_id {len(duplicates)}건을 먼저 병합해야 합니다")
+            
+            for ddl in UNIQUE_INDEX_DDL:
+                conn.execute(text(ddl))
+            
+            trans.commit()
+            print("✅ 마이그레이션 성공: ix_papers_external_id (unique) 생성 완료")
+            
+        except Exception as e:
+            trans.rollback()
+            print(f"❌ 마이그레이션 실패: {e}")
+            raise
+
+if __name__ == "__main__":
+    print("\n=== external_id 정규화 마이그레이션 시작 ===\n")
+    migrate_external_id()
+    print("\n=== 마이그레이션 완료 ===\n")